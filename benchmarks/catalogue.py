@@ -0,0 +1,237 @@
+"""
+gRunner's catalogue benchmarks.
+Times the crawl, the usage DB & the engine's search APIs against a synthetic fixture (see fixtures.py), seeded so
+ that every run walks the very same tree. Prints a JSON report, which a later run can be compared against:
+    $ python benchmarks/catalogue.py --size medium --output before.json
+    $ python benchmarks/catalogue.py --size medium --compare before.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+from fixtures import SIZES, FixtureSize, FixtureTree
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULT_COUNT = 50
+
+
+def measure(fn: Callable, runs: int, setup: Callable[[], tuple] = tuple, ops: int = 1) -> dict[str, Any]:
+    """Wall clock of fn(*setup()) over runs; setup isn't timed. ops is how many operations a single call performs."""
+    samples: list[float] = []
+    for _ in range(runs):
+        args = setup()
+        gc.collect()
+        st = time.perf_counter_ns()
+        fn(*args)
+        samples.append((time.perf_counter_ns() - st) / 1e6)
+    median = statistics.median(samples)
+    return {
+        "runs": runs,
+        "ops": ops,
+        "min_ms": min(samples),
+        "median_ms": median,
+        "mean_ms": statistics.fmean(samples),
+        "max_ms": max(samples),
+        "stdev_ms": statistics.stdev(samples) if runs > 1 else 0.,
+        "median_per_op_us": median * 1e3 / ops,
+    }
+
+
+def get_commit() -> Optional[str]:
+    proc = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+
+def seed_db(tree: FixtureTree, rng: random.Random) -> int:
+    """Usage statistics for a share of the fixture's applications, plus rows of applications that are long gone."""
+    import peewee as p
+    from model import db
+
+    now = time.time()
+    paths = [*map(str, rng.sample(tree.executables, len(tree.executables) // 3)),
+             *map(str, rng.sample(tree.desktop_files, len(tree.desktop_files) // 2)),
+             *[str(Path(tree.root, "removed", str(i))) for i in range(len(tree.executables) // 20)]]
+    rows = [(path, rng.randint(1, 200), now - rng.uniform(0, 90 * 86400), now - rng.uniform(90 * 86400, 365 * 86400))
+            for path in paths]
+    with db.Application._meta.database.atomic():
+        for chunk in p.chunked(rows, 256):
+            db.Application.insert_many(chunk, fields=[db.Application.path, db.Application.opened_count,
+                                                      db.Application.last_opened,
+                                                      db.Application.first_opened]).execute()
+    return len(rows)
+
+
+def run(tree: FixtureTree, runs: int, workers: int, queries: list[str]) -> tuple[dict[str, Any], dict[str, Any]]:
+    # gRunner is only imported now, since its globals are read from the (fixture's) environment at import time
+    from configuration import FixtureConfiguration
+    from model.applications.catalogue import Catalogue
+    from model.applications.crawler import Converter, DBExecutableFinder, ExecutableFile, FSExecutableFinder
+    from model.applications.dotdesktop import desktop_entries
+    from model.applications.snapshot import CatalogueSnapshot
+    from model.engine import Engine
+
+    cfg = FixtureConfiguration(tree.get_paths(), recursive=True, workers=workers)
+    serial_cfg = FixtureConfiguration(tree.get_paths(), recursive=True, workers=1)
+    results: dict[str, Any] = {}
+    counts: dict[str, Any] = {"executables": len(tree.executables), "desktop_files": len(tree.desktop_files)}
+
+    # crawl
+    for name, c in (("crawl.walk.cold", cfg), ("crawl.walk.cold.serial", serial_cfg)):
+        finder = FSExecutableFinder(c)
+
+        def cold(f: FSExecutableFinder = finder) -> tuple:
+            # neither the snapshot nor parsed desktop entries survive from the previous run
+            f.snapshot = CatalogueSnapshot()
+            desktop_entries.entries = {}
+            return Catalogue(),
+
+        results[name] = measure(finder.walk, runs, cold)
+
+    finder = FSExecutableFinder(cfg)
+    counts["walked"] = len(finder.walk(Catalogue()))
+    results["crawl.walk.warm"] = measure(finder.walk, runs, lambda: (Catalogue(),))
+
+    # every binary & visible desktop entry of the tree, in walk order
+    executables: list[ExecutableFile] = []
+    xdg_applications = []
+    catalogue = Catalogue()
+    for directory in tree.get_paths():
+        for current, _, files in os.walk(directory):
+            for fname in sorted(files):
+                path = os.path.join(current, fname)
+                if fname.endswith(".desktop"):
+                    if (app := Converter.convert_dotdesktop_to_application(path, catalogue)) is not None:
+                        xdg_applications.append(app)
+                elif os.access(path, os.X_OK):
+                    executables.append(ExecutableFile(current, fname))
+    hidden = executables.copy()
+    finder._filter_xdg_from_binary_entries(hidden, xdg_applications)
+    counts["hidden_by_desktop_files"] = len(executables) - len(hidden)
+    results["crawl.filter_xdg"] = measure(finder._filter_xdg_from_binary_entries, runs,
+                                          lambda: (executables.copy(), xdg_applications))
+
+    # usage DB
+    counts["db_rows"] = seed_db(tree, random.Random(len(tree.executables)))
+    db_finder = DBExecutableFinder(cfg)
+    results["db.walk"] = measure(db_finder.walk, runs)
+
+    # engine
+    results["engine.init"] = measure(lambda: Engine(cfg).get_executables(), runs)
+    engine = Engine(cfg)
+    counts["catalogue"] = len(engine.get_executables())
+
+    def search(matches: Callable[[str, int], list]):
+        for query in queries:
+            matches(query, RESULT_COUNT)
+
+    results["engine.best_name_matches"] = measure(search, runs, lambda: (engine.get_best_name_matches,),
+                                                  ops=len(queries))
+    results["engine.best_path_matches"] = measure(search, runs, lambda: (engine.get_best_path_matches,),
+                                                  ops=len(queries))
+
+    def type_queries(create_session: Callable[[], Any]):
+        # a fresh session per query, fed one keystroke at a time, as the entry would
+        for query in queries:
+            session = create_session()
+            for i in range(1, len(query) + 1):
+                session.search(query[:i], RESULT_COUNT)
+
+    keystrokes = sum(map(len, queries))
+    results["engine.session.keystrokes"] = measure(type_queries, runs, lambda: (engine.create_name_search_session,),
+                                                   ops=keystrokes)
+    # the same keystrokes, searched from scratch every time; what the session saves
+    results["engine.session.keystrokes.oneshot"] = measure(
+        type_queries, runs, lambda: (lambda: SimpleNamespace(search=engine.get_best_name_matches),), ops=keystrokes
+    )
+    results["engine.most_recent_applications"] = measure(
+        lambda: [engine.get_most_recent_applications(RESULT_COUNT) for _ in range(100)], runs, ops=100
+    )
+    return results, counts
+
+
+def compare(baseline: dict[str, Any], report: dict[str, Any], threshold: float) -> int:
+    """Print the median of every benchmark against baseline's; the amount of regressions beyond threshold."""
+    regressions = 0
+    print(f"{'benchmark':<36}{'before ms':>12}{'after ms':>12}{'ratio':>8}", file=sys.stderr)
+    for name, result in report["results"].items():
+        if (before := baseline.get("results", {}).get(name)) is None:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        regressed = ratio > 1 + threshold
+        regressions += regressed
+        print(f"{name:<36}{before['median_ms']:>12.3f}{result['median_ms']:>12.3f}{ratio:>8.2f}"
+              f"{'  REGRESSED' if regressed else ''}", file=sys.stderr)
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=SIZES.keys(), default="medium")
+    parser.add_argument("--directories", type=int, help="directories on $PATH")
+    parser.add_argument("--executables", type=int, help="executables per $PATH directory")
+    parser.add_argument("--desktop-files", type=int)
+    parser.add_argument("--symlinks", type=int)
+    parser.add_argument("--depth", type=int, help="depth of the recursive tree")
+    parser.add_argument("--branching", type=int, help="subdirectories per directory of the recursive tree")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="crawler threads; the configuration's default if omitted")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--output", type=Path, help="write the report here, rather than to stdout")
+    parser.add_argument("--compare", type=Path, help="a previous report, to compare medians against")
+    parser.add_argument("--threshold", type=float, default=.1, help="slowdown reported as a regression")
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args(argv)
+
+    size = FixtureSize(**{field: getattr(args, field) if getattr(args, field) is not None else default
+                          for field, default in SIZES[args.size]._asdict().items()})
+
+    with tempfile.TemporaryDirectory(prefix="grunner-bench-") as root:
+        tree = FixtureTree(Path(root), size, args.seed).generate()
+        os.environ.update(tree.get_environment())
+        sys.path.insert(0, str(ROOT))
+
+        from loguru import logger
+        from globals import DEFAULT_WORKERS
+
+        logger.remove()
+        logger.add(sys.stderr, level=args.log_level)
+        workers = args.workers or DEFAULT_WORKERS
+        results, counts = run(tree, args.runs, workers, tree.get_queries(args.queries))
+
+    report = {
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fixture": size._asdict() | {"seed": args.seed, "workers": workers} | counts,
+        "results": results,
+    }
+    if args.output is not None:
+        with args.output.open(mode="w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+    if args.compare is not None:
+        with args.compare.open(mode="r", encoding="utf-8") as f:
+            return 1 if compare(json.load(f), report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    exit(main(sys.argv[1:]))
@@ -0,0 +1,21 @@
+"""
+gRunner's benchmark configuration.
+Imports globals, so it's only imported once the environment points at the fixture.
+"""
+
+from globals import DEFAULT_TERMINAL, Configuration
+
+
+class FixtureConfiguration(Configuration):
+    """A Configuration over the fixture's directories, rather than the user's configuration file."""
+
+    # noinspection PyMissingConstructor
+    def __init__(self, paths: list[str], recursive: bool, workers: int):
+        self.data = {
+            Configuration.RECURSIVE: recursive,
+            Configuration.SHORTCUTS: {},
+            Configuration.PATHS: paths,
+            Configuration.GTK: {},
+            Configuration.WORKERS: workers,
+            Configuration.TERMINAL: DEFAULT_TERMINAL,
+        }
@@ -0,0 +1,176 @@
+"""
+gRunner's benchmark fixtures.
+Synthetic $PATH & XDG trees of configurable size, generated from a seed so that every run (& every commit) walks
+ the very same files. Only the standard library is imported here: gRunner reads $HOME, $PATH & $XDG_DATA_DIRS once,
+ when globals is first imported, so the environment must point at the fixture before anything of gRunner is.
+"""
+
+import os
+import random
+from pathlib import Path
+from typing import NamedTuple
+
+_SYLLABLES = ("gn", "ome", "ter", "min", "al", "fire", "fox", "net", "work", "man", "ager", "vi", "code", "py",
+              "thon", "git", "hub", "doc", "ker", "tool", "box", "cal", "cul", "ator", "text", "edit", "or", "mail",
+              "sys", "mon", "ctl", "d", "x", "lib", "re", "office", "writer", "draw", "play", "er", "steam", "zip")
+_SHEBANG = b"#!/bin/sh\nexit 0\n"
+_EXECUTABLE = 0o755
+_PLAIN = 0o644
+
+
+class FixtureSize(NamedTuple):
+    directories: int
+    executables: int
+    desktop_files: int
+    symlinks: int
+    depth: int
+    branching: int
+
+
+SIZES: dict[str, FixtureSize] = {
+    # directories & executables per directory on $PATH, .desktop files, symlinks, depth & fan-out of the deep tree
+    "small": FixtureSize(4, 100, 100, 200, 3, 2),
+    "medium": FixtureSize(8, 500, 400, 1000, 4, 3),
+    "large": FixtureSize(16, 2000, 1500, 5000, 5, 4),
+}
+
+
+def _get_name(rng: random.Random) -> str:
+    parts = ["".join(rng.choices(_SYLLABLES, k=rng.randint(1, 3))) for _ in range(rng.choice((1, 1, 1, 2, 2, 3)))]
+    return "-".join(parts)
+
+
+class FixtureTree:
+    """
+    Layout, under root:
+        home/                       $HOME, so that gRunner's own files (DB, snapshot & caches) stay in the fixture
+        bin/<i>/                    the $PATH directories: executables, a few plain files & names shadowed by later dirs
+        links/                      a symlink farm: links to executables, to directories & dangling ones
+        deep/                       a recursive tree, walked only when recursive
+        share/<i>/applications/     the $XDG_DATA_DIRS entries
+    """
+
+    def __init__(self, root: Path, size: FixtureSize, seed: int = 0):
+        self.root = root
+        self.size = size
+        self.rng = random.Random(seed)
+        self.home = Path(root, "home")
+        self.bins = [Path(root, "bin", str(i)) for i in range(size.directories)]
+        self.links = Path(root, "links")
+        self.deep = Path(root, "deep")
+        self.shares = [Path(root, "share", str(i)) for i in range(2)]
+        # every executable on $PATH, in walk order
+        self.executables: list[Path] = []
+        self.desktop_files: list[Path] = []
+
+    def get_environment(self) -> dict[str, str]:
+        return {
+            "HOME": str(self.home),
+            "XDG_DATA_HOME": str(Path(self.home, ".local", "share")),
+            "XDG_DATA_DIRS": ":".join(map(str, self.shares)),
+            "PATH": ":".join([*map(str, self.bins), str(self.links), os.defpath]),
+        }
+
+    def get_paths(self) -> list[str]:
+        """Every directory gRunner should walk, same as the default configuration would list them."""
+        return [*map(str, self.bins), str(self.links), str(self.deep),
+                *[str(Path(s, "applications")) for s in self.shares]]
+
+    @staticmethod
+    def _write(path: Path, content: bytes, mode: int):
+        path.write_bytes(content)
+        path.chmod(mode)
+
+    def _generate_bins(self):
+        names: list[str] = []
+        for directory in self.bins:
+            directory.mkdir(parents=True)
+            taken: set[str] = set()
+            for _ in range(self.size.executables):
+                # a tenth of the names repeat ones of earlier directories, which the later ones are shadowed by
+                name = self.rng.choice(names) if names and self.rng.random() < .1 else _get_name(self.rng)
+                while name in taken:
+                    name = f"{name}{self.rng.randint(0, 9)}"
+                taken.add(name)
+                path = Path(directory, name)
+                if self.rng.random() < .05:
+                    self._write(path, b"data\n", _PLAIN)
+                    continue
+                self._write(path, _SHEBANG, _EXECUTABLE)
+                self.executables.append(path)
+                names.append(name)
+
+    def _generate_links(self):
+        self.links.mkdir(parents=True)
+        for i in range(self.size.symlinks):
+            roll = self.rng.random()
+            if roll < .8 and self.executables:
+                target = self.rng.choice(self.executables)
+            elif roll < .9:
+                target = Path(self.root, "missing", str(i))
+            else:
+                target = self.rng.choice(self.bins)
+            Path(self.links, f"{target.name}-{i}").symlink_to(target)
+
+    def _generate_deep(self, directory: Path, depth: int):
+        directory.mkdir(parents=True)
+        for _ in range(5):
+            name = _get_name(self.rng)
+            path = Path(directory, name)
+            if not path.exists():
+                self._write(path, _SHEBANG, _EXECUTABLE)
+        if depth:
+            for i in range(self.size.branching):
+                self._generate_deep(Path(directory, f"{_get_name(self.rng)}.{i}"), depth - 1)
+
+    def _generate_desktop_files(self):
+        for share in self.shares:
+            Path(share, "applications").mkdir(parents=True)
+        for i in range(self.size.desktop_files):
+            roll = self.rng.random()
+            if roll < .4 and self.executables:
+                # by name, hiding the first binary on $PATH with that name
+                exec_ = f"{self.rng.choice(self.executables).name} %U"
+            elif roll < .6 and self.executables:
+                # by absolute path
+                exec_ = f"{self.rng.choice(self.executables)} --new-window %F"
+            else:
+                exec_ = f"/opt/{_get_name(self.rng)}/bin/{_get_name(self.rng)} %u"
+            name = _get_name(self.rng)
+            lines = [
+                "[Desktop Entry]",
+                f"Type={'Link' if self.rng.random() < .02 else 'Application'}",
+                f"Name={name.replace('-', ' ').title()}",
+                f"Exec={exec_}",
+                f"Icon={name}",
+            ]
+            if self.rng.random() < .05:
+                lines.append("NoDisplay=true")
+            path = Path(self.rng.choice(self.shares), "applications", f"org.fixture.{name}.{i}.desktop")
+            self._write(path, ("\n".join(lines) + "\n").encode(), _PLAIN)
+            self.desktop_files.append(path)
+
+    def generate(self) -> "FixtureTree":
+        self.home.mkdir(parents=True)
+        self._generate_bins()
+        self._generate_links()
+        self._generate_deep(self.deep, self.size.depth)
+        self._generate_desktop_files()
+        return self
+
+    def get_queries(self, count: int) -> list[str]:
+        """Queries a user would type: prefixes, whole names, typos & fragments of names in the fixture."""
+        queries: list[str] = []
+        for path in self.rng.sample(self.executables, min(count, len(self.executables))):
+            name = path.name
+            match len(queries) % 4:
+                case 0:
+                    queries.append(name[:3])
+                case 1:
+                    queries.append(name)
+                case 2 if len(name) > 3:
+                    i = self.rng.randrange(len(name) - 1)
+                    queries.append(name[:i] + name[i + 1] + name[i] + name[i + 2:])
+                case _:
+                    queries.append(name[len(name) // 3:])
+        return queries
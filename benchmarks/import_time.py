@@ -0,0 +1,87 @@
+"""
+gRunner's import time benchmark.
+Measures what an invocation pays in imports before it can act: the client path (main, up to the summon) must stay
+ a small fraction of the resident instance's (GTK, peewee & the model). Prints a JSON report:
+    $ python benchmarks/import_time.py --runs 10 > import_time.json
+Every interpreter runs with -B, so that none writes bytecode the next one would then find; they still read whatever
+ __pycache__ already has, same as an installed gRunner would. main refuses to run as root by design, right at
+ import; its imports all come before that check, so they're still measured, but the target reports a failed exit.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# module -> what importing it stands for
+TARGETS = {
+    "main": "client path: everything imported before the summon",
+    "cli": "CLI client",
+    "resident": "resident instance: GTK, peewee & the model",
+}
+
+
+def importtime(module: str) -> dict:
+    """Cumulative & heaviest imports of module, as reported by python -X importtime."""
+    proc = subprocess.run([sys.executable, "-B", "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    imports: list[tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        imports.append((name.strip(), int(own), int(cumulative)))
+
+    report = {"returncode": proc.returncode}
+    if proc.returncode != 0 and (errors := [line for line in proc.stderr.splitlines()
+                                            if line and not line.startswith("import time:")]):
+        report["error"] = errors[-1]
+    return report | {
+        "total_us": sum(own for _, own, _ in imports),
+        "modules": len(imports),
+        "heaviest": [{"module": name, "self_us": own, "cumulative_us": cumulative}
+                     for name, own, cumulative in sorted(imports, key=lambda i: i[1], reverse=True)[:10]],
+    }
+
+
+def wall_time(module: str, runs: int) -> dict:
+    """Wall clock of a whole interpreter that imports module, startup included."""
+    samples = []
+    for _ in range(runs):
+        st = time.perf_counter()
+        subprocess.run([sys.executable, "-B", "-c", f"import {module}"], cwd=ROOT, capture_output=True)
+        samples.append(time.perf_counter() - st)
+    return {"median_ms": statistics.median(samples) * 1e3, "min_ms": min(samples) * 1e3}
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "baseline": wall_time("sys", args.runs),
+        "targets": {},
+    }
+    for module, description in TARGETS.items():
+        report["targets"][module] = {
+            "description": description,
+            "importtime": importtime(module),
+            "wall": wall_time(module, args.runs),
+        }
+    if os.geteuid() == 0:
+        report["targets"]["main"]["note"] = "measured as root: main exits at its root check, after its imports"
+    json.dump(report, sys.stdout, indent=4)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+"""
+gRunner's command line client.
+Queries the resident background process over IPC & streams its answers to stdout, either as tab-separated
+ (id, name, path) lines for dmenu/rofi-style pipelines, or as JSON Lines. Deliberately imports neither GTK nor the
+ model, so that a lookup costs a connect & a round trip:
+    $ python cli.py query firef | cut -f1 | head -n1 | xargs -d '\\n' python cli.py launch
+"""
+
+import argparse
+import json
+import sys
+
+from ipc import Command, IPCClient, Status, get_address
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="grunner", description="Query the running gRunner instance.")
+    parser.add_argument("--json", action="store_true", help="print JSON Lines instead of tab-separated values")
+    parser.add_argument("--timeout", type=float, default=10., help="seconds to wait on the running instance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="fuzzy search the catalogue")
+    query.add_argument("query")
+    query.add_argument("-n", "--count", type=int, default=10)
+    query.add_argument("--by", choices=("name", "path"), default="name")
+
+    top = commands.add_parser("top", help="most frecent applications")
+    top.add_argument("-n", "--count", type=int, default=10)
+
+    launch = commands.add_parser("launch", help="launch an application by id")
+    launch.add_argument("id")
+    launch.add_argument("args", nargs=argparse.REMAINDER)
+
+    stats = commands.add_parser("stats", help="latency percentiles of the running instance, in milliseconds")
+    stats.add_argument("--export", action="store_true", help="also write a Chrome trace of the latest spans")
+
+    return parser.parse_args(argv)
+
+
+def to_request(args: argparse.Namespace) -> tuple[Command, dict]:
+    match args.command:
+        case "query":
+            return Command.QUERY, {"query": args.query, "count": args.count, "by": args.by}
+        case "top":
+            return Command.TOP_N, {"count": args.count}
+        case "launch":
+            return Command.LAUNCH, {"id": args.id, "args": args.args}
+        case "stats":
+            return Command.STATS, {"export": args.export}
+
+
+def format_record(record: dict) -> str:
+    if "span" in record:
+        # span, count, p50, p99 & max
+        return "\t".join([record["span"], str(record["count"]),
+                          *[f"{record[key] / 1000:.3f}" for key in ("p50", "p99", "max")]])
+    return f"{record['id']}\t{record['name']}\t{record['path']}"
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    cmd, request = to_request(args)
+    try:
+        with IPCClient(get_address(), args.timeout) as client:
+            status, reply = client.request(cmd, json.dumps(request).encode())
+    except TimeoutError:
+        print(f"gRunner didn't respond within {args.timeout}s", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"gRunner isn't running ({e})", file=sys.stderr)
+        return 2
+
+    if status != Status.OK:
+        print(reply.decode(errors="replace"), file=sys.stderr)
+        return 1
+
+    out = sys.stdout
+    for line in reply.decode().splitlines():
+        if args.json:
+            out.write(line + "\n")
+            continue
+        record = json.loads(line)
+        if "trace" in record:
+            print(f"trace written to {record['trace']}", file=sys.stderr)
+            continue
+        out.write(format_record(record) + "\n")
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        exit(main(sys.argv[1:]))
+    except BrokenPipeError:
+        # e.g. piped into head
+        exit(0)
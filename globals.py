@@ -1,42 +1,41 @@
 import json
 import os
 from pathlib import Path
-from time import perf_counter
 from typing import Any
 
-from loguru import logger
-
 
 # Writing boilerplate code to avoid writing boilerplate code!
 # https://stackoverflow.com/questions/32910096/is-there-a-way-to-auto-generate-a-str-implementation-in-python
 def autostr(cls):
     """Automatically implements __str__ for any class."""
 
+    def fields(self):
+        if hasattr(self, "__dict__"):
+            return vars(self).items()
+        # __slots__ classes: public slots & properties, since private slots are usually just storage
+        names = [name for klass in reversed(type(self).__mro__)
+                 for name, attr in vars(klass).items()
+                 if not name.startswith("_")
+                 and (isinstance(attr, property) or name in getattr(klass, "__slots__", ()))]
+        return ((name, getattr(self, name)) for name in dict.fromkeys(names))
+
     def __str__(self):
         return '%s(%s)' % (
             type(self).__name__,
-            ', '.join('%s=%s' % item for item in vars(self).items())
+            ', '.join('%s=%s' % item for item in fields(self))
         )
 
     cls.__str__ = __str__
     return cls
 
 
-def timeit(fn):
-    def wrapper(*args, **kwargs):
-        st = perf_counter()
-        try:
-            return fn(*args, **kwargs)
-        finally:
-            en = perf_counter()
-            logger.debug(f"{fn.__name__} took {round(en - st, 4)}s")
-
-    return wrapper
-
-
 class Global:
     ROOT = Path(Path.home(), ".grunner")
     DB = Path(ROOT, "db.sqlite")
+    SNAPSHOT = Path(ROOT, "catalogue.snapshot")
+    CATALOGUE_DUMP = Path(ROOT, "catalogue.dump")
+    DESKTOP_CACHE = Path(ROOT, "dotdesktop.cache")
+    ICON_CACHE = Path(ROOT, "icons.cache")
     CFG = Path(ROOT, "config.json")
     LOGS = Path(ROOT, "logs")
     # this is the $PATH bash variable
@@ -52,12 +51,21 @@ class Global:
     LOGS.mkdir(mode=0o700, parents=True, exist_ok=True)
 
 
+# crawler threads; the configuration may raise it
+DEFAULT_WORKERS = 1
+# what Terminal=true entries run in, followed by their own command line:
+#  https://gitlab.freedesktop.org/terminal-wg/specifications/-/merge_requests/3
+DEFAULT_TERMINAL = ["xdg-terminal-exec"]
+
+
 @autostr
 class Configuration:
     RECURSIVE = "recursive"
     SHORTCUTS = "shortcuts"
     PATHS = "paths"
     GTK = "gtk"
+    WORKERS = "workers"
+    TERMINAL = "terminal"
 
     def __init__(self):
         self.data = None
@@ -71,6 +79,16 @@ class Configuration:
             raise ValueError(f"Key {Configuration.PATHS} not found.")
         if Configuration.GTK not in self.data:
             raise ValueError(f"Key {Configuration.GTK} not found.")
+        # optional, since it was introduced after the first configuration files were written
+        self.data.setdefault(Configuration.WORKERS, DEFAULT_WORKERS)
+        workers = self.data[Configuration.WORKERS]
+        # type(), since a bool is an int, but no amount of workers
+        if type(workers) is not int or workers < 1:
+            raise ValueError(f"Key {Configuration.WORKERS} must be an integer of at least 1, not {workers!r}.")
+        self.data.setdefault(Configuration.TERMINAL, DEFAULT_TERMINAL)
+        terminal = self.data[Configuration.TERMINAL]
+        if not isinstance(terminal, list) or not terminal or not all(isinstance(a, str) and a for a in terminal):
+            raise ValueError(f"Key {Configuration.TERMINAL} must be a non-empty list of arguments, not {terminal!r}.")
 
     def get_recursive(self) -> bool:
         return self.data[Configuration.RECURSIVE]
@@ -84,6 +102,12 @@ class Configuration:
     def get_gtk(self) -> dict[str, Any]:
         return self.data[Configuration.GTK]
 
+    def get_workers(self) -> int:
+        return self.data[Configuration.WORKERS]
+
+    def get_terminal(self) -> list[str]:
+        return self.data[Configuration.TERMINAL]
+
     def update_recursive(self, column: bool):
         self.data[Configuration.RECURSIVE] = column
 
@@ -124,6 +148,8 @@ if not Global.CFG.exists():
             "hitcount": 10,
             "applicationcount": 5,
         },
+        Configuration.WORKERS: DEFAULT_WORKERS,
+        Configuration.TERMINAL: DEFAULT_TERMINAL,
     }
 
     with Global.CFG.open(mode="w", encoding="utf-8") as cfg:
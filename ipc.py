@@ -1,67 +1,133 @@
+"""
+gRunner's inter-process communication module.
+The background process listens on a Unix socket (in $XDG_RUNTIME_DIR, or in the abstract namespace as a fallback)
+ and only serves peers running as the same user, as reported by the kernel (SO_PEERCRED); clients check the same of
+ the server, since any user may bind an abstract name first.
+Every message is a binary frame: a fixed header, followed by an optional payload; requests carry an id that
+ their reply echoes, so that a client may pipeline as many as it likes over one connection.
+This module is the protocol & the client, and sticks to the standard library, since every hotkey press imports it;
+ the server lives in ipc_server.
+"""
+
 import enum
-import fnmatch
 import os
-import tempfile
-from functools import partial
-from multiprocessing.connection import Client, Listener
-from secrets import token_bytes
-from typing import Callable
-
-from loguru import logger
-
-from globals import Global
-
-
-class Command(enum.Enum):
-    CLOSE = 1
-    START_GUI = 2
-
+import socket
+import struct
+from typing import Callable, Optional
 
-def notify_running_process(addr, key, cmd):
-    with Client(addr, authkey=key) as serv:
-        serv.send(cmd)
+from globals import Global, autostr
 
+# frame header: command (or status, for replies), request id, payload length
+HEADER = struct.Struct("!BII")
+# struct ucred { pid_t pid; uid_t uid; gid_t gid; }
+_UCRED = struct.Struct("3i")
 
-def loop_process(addr, key, actions: dict[Command, Callable]):
-    with Listener(addr, authkey=key) as server:
-        while True:
-            try:
-                logger.debug("Waiting for client...")
+MAX_PAYLOAD = 1 << 20
 
-                with server.accept() as client:
-                    logger.trace("Waiting for message...")
-                    msg = client.recv()
+# seconds a summon may take: the resident instance replies as soon as it has scheduled the window, so a summon that
+#  takes any longer than this is talking to an instance that's wedged
+SUMMON_TIMEOUT = 1.
 
-                logger.debug(f"Got {msg}")
-                actions[msg]()
-            except Exception as e:
-                logger.debug(f"Exception: {e}")
+# an action gets the request's payload & returns the reply's payload, if any
+Action = Callable[[bytes], Optional[bytes]]
 
 
-__pkfn: str
-
-
-def generate_pk() -> bytes:
-    global __pkfn
-    pk = token_bytes(128)
-    with tempfile.NamedTemporaryFile(suffix=Global.APP_GUID, delete=False) as pkf:
-        pkf.write(pk)
-        __pkfn = pkf.name
-    return pk
-
-
-def get_generated_pk() -> bytes:
-    global __pkfn
-    match = partial(fnmatch.fnmatch, pat=f"*{Global.APP_GUID}")
-    files = os.listdir(tempfile.gettempdir())
-    __pkfn = files[list(map(match, files)).index(True)]
-    with open(tempfile.gettempdir() + os.sep + __pkfn, "rb") as pkf:
-        return pkf.read()
-
-
-def cleanup():
-    try:
-        os.remove(__pkfn)
-        logger.debug(f"deleted {__pkfn}")
-    except Exception as e:
-        logger.warning(f"couldn't remove {__pkfn}, got exception {e}")
+class Command(enum.IntEnum):
+    CLOSE = 1
+    START_GUI = 2
+    QUERY = 3
+    LAUNCH = 4
+    TOP_N = 5
+    STATS = 6
+
+
+class Status(enum.IntEnum):
+    OK = 0
+    ERROR = 1
+
+
+def get_address() -> str:
+    if runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(runtime_dir, f"{Global.APP_GUID}.sock")
+    # abstract sockets aren't files, so they're visible to every user; keep the name per-user at least
+    return f"\0{Global.APP_GUID}-{os.getuid()}"
+
+
+def get_peer_uid(sock: socket.socket) -> int:
+    _, uid, _ = _UCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _UCRED.size))
+    return uid
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("peer closed the connection mid-frame")
+        buf += chunk
+    return bytes(buf)
+
+
+def pack_frame(code: int, request_id: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(code, request_id, len(payload)) + payload
+
+
+def recv_frame(sock: socket.socket) -> tuple[int, int, bytes]:
+    code, request_id, length = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return code, request_id, _recv_exactly(sock, length) if length else b""
+
+
+@autostr
+class IPCClient:
+    """
+    Blocking client of the background process. Requests may be pipelined: send() as many as needed up front,
+     then receive() the replies, which arrive in completion order & carry the id of their request.
+    """
+
+    def __init__(self, addr: str, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM | socket.SOCK_CLOEXEC)
+        # bounds connecting (which blocks while the server's accept backlog is full) & every send & receive after it;
+        #  running out raises TimeoutError
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(addr)
+            if (uid := get_peer_uid(self.sock)) != os.getuid():
+                raise PermissionError(f"{addr!r} is served by uid {uid}, rather than by gRunner of uid {os.getuid()}")
+        except OSError:
+            self.sock.close()
+            raise
+        self.next_id = 0
+        # replies that arrived while waiting on a different request
+        self.unclaimed: dict[int, tuple[Status, bytes]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def send(self, cmd: Command, payload: bytes = b"") -> int:
+        request_id = self.next_id
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        self.sock.sendall(pack_frame(cmd, request_id, payload))
+        return request_id
+
+    def receive(self) -> tuple[int, Status, bytes]:
+        status, request_id, payload = recv_frame(self.sock)
+        return request_id, Status(status), payload
+
+    def request(self, cmd: Command, payload: bytes = b"") -> tuple[Status, bytes]:
+        request_id = self.send(cmd, payload)
+        while (reply := self.unclaimed.pop(request_id, None)) is None:
+            rid, status, reply_payload = self.receive()
+            self.unclaimed[rid] = (status, reply_payload)
+        return reply
+
+    def close(self):
+        self.sock.close()
+
+
+def notify_running_process(addr: str, cmd: Command, payload: bytes = b"",
+                           timeout: Optional[float] = None) -> tuple[Status, bytes]:
+    with IPCClient(addr, timeout) as client:
+        return client.request(cmd, payload)
@@ -0,0 +1,241 @@
+"""
+gRunner's IPC server.
+Only the resident instance imports this; see ipc for the protocol.
+"""
+
+import functools
+import os
+import queue
+import selectors
+import socket
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter_ns
+from typing import Optional
+
+from loguru import logger
+
+from globals import autostr
+from ipc import HEADER, MAX_PAYLOAD, Action, Command, Status, get_peer_uid, pack_frame
+from tracing import traced, tracer
+
+
+def listen(addr: str) -> socket.socket:
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM | socket.SOCK_CLOEXEC)
+    if not addr.startswith("\0"):
+        # a leftover of an instance that crashed; we're holding the instance lock, so nobody else is serving it
+        try:
+            os.remove(addr)
+        except FileNotFoundError:
+            pass
+    server.bind(addr)
+    if not addr.startswith("\0"):
+        os.chmod(addr, 0o600)
+    server.listen()
+    return server
+
+
+class _Connection:
+    __slots__ = ("sock", "inbox", "outbox", "closed")
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.closed = False
+
+
+@autostr
+class IPCServer:
+    """
+    Single-threaded, selector-driven server: it multiplexes any number of clients & pipelined requests, and hands
+     every action to a worker pool, so a slow action never stalls the listener. Replies are queued back to the
+     selector thread, which is the only one that ever touches a connection.
+    """
+
+    def __init__(self, addr: str, actions: dict[Command, Action], workers: int = 4):
+        self.addr = addr
+        self.actions = actions
+        self.uid = os.getuid()
+
+        self.selector = selectors.DefaultSelector()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ipc-worker")
+        self.replies: queue.SimpleQueue[tuple[_Connection, bytes]] = queue.SimpleQueue()
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.wakeup_w.setblocking(False)
+        self.stopping = False
+        self.server: Optional[socket.socket] = None
+
+    def bind(self):
+        """Start listening, which serve_forever otherwise does itself; raises OSError if the address is taken."""
+        self.server = listen(self.addr)
+
+    def serve_forever(self):
+        if self.server is None:
+            self.bind()
+        server = self.server
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, functools.partial(self._accept, server))
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, self._drain_replies)
+        try:
+            while not self.stopping:
+                for key, events in self.selector.select():
+                    key.data(events)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            for key in list(self.selector.get_map().values()):
+                key.fileobj.close()
+            self.selector.close()
+
+    def stop(self):
+        """Thread-safe."""
+        self.stopping = True
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            self.wakeup_w.send(b"\0")
+        except BlockingIOError:
+            # the selector thread already has a wakeup pending
+            pass
+        except OSError:
+            # stopped
+            pass
+
+    @traced("ipc.accept")
+    def _accept(self, server: socket.socket, events: int):
+        while True:
+            try:
+                sock, _ = server.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # e.g. out of fds (EMFILE), or the client gave up in the meantime (ECONNABORTED); the pending
+                #  connections are retried on the next select, rather than taking the listener down
+                logger.warning(f"couldn't accept IPC connection, got exception {e}")
+                return
+
+            try:
+                peer = get_peer_uid(sock)
+            except OSError as e:
+                logger.warning(f"couldn't get IPC client credentials, got exception {e}")
+                sock.close()
+                continue
+            if peer != self.uid:
+                logger.warning(f"refusing IPC connection from uid {peer}")
+                sock.close()
+                continue
+
+            sock.setblocking(False)
+            conn = _Connection(sock)
+            self.selector.register(sock, selectors.EVENT_READ, functools.partial(self._serve, conn))
+
+    def _serve(self, conn: _Connection, events: int):
+        if events & selectors.EVENT_WRITE:
+            self._flush(conn)
+        if conn.closed or not events & selectors.EVENT_READ:
+            return
+
+        try:
+            data = conn.sock.recv(64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.warning(f"IPC client connection failed, got exception {e}")
+            self._close(conn)
+            return
+        if not data:
+            self._close(conn)
+            return
+
+        conn.inbox += data
+        # a reply that failed to send closes the connection, in which case the rest of the inbox is moot
+        while not conn.closed and len(conn.inbox) >= HEADER.size:
+            cmd, request_id, length = HEADER.unpack_from(conn.inbox)
+            if length > MAX_PAYLOAD:
+                logger.warning(f"IPC client sent a {length} byte payload, dropping it")
+                self._close(conn)
+                return
+            if len(conn.inbox) < HEADER.size + length:
+                break
+            payload = bytes(conn.inbox[HEADER.size:HEADER.size + length])
+            del conn.inbox[:HEADER.size + length]
+            self._dispatch(conn, cmd, request_id, payload)
+
+    def _dispatch(self, conn: _Connection, cmd: int, request_id: int, payload: bytes):
+        received_ns = perf_counter_ns()
+        try:
+            action = self.actions[Command(cmd)]
+        except (ValueError, KeyError):
+            logger.warning(f"IPC client sent unsupported command {cmd}")
+            conn.outbox += pack_frame(Status.ERROR, request_id, f"unsupported command {cmd}".encode())
+            self._flush(conn)
+            return
+
+        logger.debug(f"Got {Command(cmd)} ({request_id})")
+        future = self.executor.submit(self._run, Command(cmd), request_id, action, payload)
+        future.add_done_callback(functools.partial(self._complete, conn, Command(cmd), request_id, received_ns))
+
+    @staticmethod
+    def _run(cmd: Command, request_id: int, action: Action, payload: bytes) -> Optional[bytes]:
+        with tracer.span("ipc.dispatch", command=cmd.name, request_id=request_id):
+            return action(payload)
+
+    def _complete(self, conn: _Connection, cmd: Command, request_id: int, received_ns: int, future: Future):
+        # runs on a worker; the reply is handed over to the selector thread
+        try:
+            frame = pack_frame(Status.OK, request_id, future.result() or b"")
+        except Exception as e:
+            logger.exception(f"IPC command {cmd.name} ({request_id}) failed")
+            frame = pack_frame(Status.ERROR, request_id, str(e).encode())
+        # time in the server, queueing for a worker included
+        tracer.record(f"ipc.{cmd.name.lower()}", received_ns)
+        self.replies.put((conn, frame))
+        self._wakeup()
+
+    def _drain_replies(self, events: int):
+        try:
+            while self.wakeup_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        while True:
+            try:
+                conn, frame = self.replies.get_nowait()
+            except queue.Empty:
+                return
+            if not conn.closed:
+                conn.outbox += frame
+                self._flush(conn)
+
+    def _flush(self, conn: _Connection):
+        if conn.closed:
+            return
+        try:
+            sent = conn.sock.send(conn.outbox) if conn.outbox else 0
+        except BlockingIOError:
+            sent = 0
+        except OSError as e:
+            logger.warning(f"couldn't reply to IPC client, got exception {e}")
+            self._close(conn)
+            return
+        del conn.outbox[:sent]
+        # only wait for writability while there's something left to write
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.outbox else 0)
+        self.selector.modify(conn.sock, events, self.selector.get_key(conn.sock).data)
+
+    def _close(self, conn: _Connection):
+        conn.closed = True
+        self.selector.unregister(conn.sock)
+        conn.sock.close()
+
+
+def cleanup(addr: str):
+    if addr.startswith("\0"):
+        return
+    try:
+        os.remove(addr)
+        logger.debug(f"deleted {addr}")
+    except Exception as e:
+        logger.warning(f"couldn't remove {addr}, got exception {e}")
@@ -0,0 +1,91 @@
+"""
+gRunner's headless API.
+Serves catalogue lookups & launches from the resident Engine over IPC, so that scripts & the CLI never have to walk
+ the filesystem themselves. Requests are JSON objects; replies are JSON Lines, one application record per line
+ (or one span record per line, for STATS).
+"""
+
+import json
+from typing import Any, Iterable
+
+from ipc import Action, Command
+from tracing import tracer
+from .applications.applications import Application, XDGDesktopApplication
+from .engine import Engine
+
+DEFAULT_COUNT = 10
+
+
+def get_application_id(app: Application) -> str:
+    """The key of app in the catalogue; what LAUNCH expects back."""
+    return app.get_full_path_dfp() if isinstance(app, XDGDesktopApplication) else app.get_full_path()
+
+
+def to_record(app: Application) -> dict[str, Any]:
+    return {
+        "id": get_application_id(app),
+        "name": app.get_name(),
+        "path": app.get_full_path(),
+        "type": app.get_application_type(),
+        "icon": app.get_icon(),
+        "opened_count": app.opened_count,
+        "last_opened": app.last_opened_utc,
+    }
+
+
+def _to_json_lines(apps: Iterable[Application]) -> bytes:
+    return "".join(json.dumps(to_record(app)) + "\n" for app in apps).encode()
+
+
+def _parse(payload: bytes) -> dict[str, Any]:
+    request = json.loads(payload) if payload else {}
+    if not isinstance(request, dict):
+        raise ValueError(f"expected a JSON object, got {type(request).__name__}")
+    return request
+
+
+class HeadlessAPI:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def get_actions(self) -> dict[Command, Action]:
+        return {
+            Command.QUERY: self.query,
+            Command.LAUNCH: self.launch,
+            Command.TOP_N: self.top_n,
+            Command.STATS: self.stats,
+        }
+
+    def query(self, payload: bytes) -> bytes:
+        """{"query": str, "count": int, "by": "name" | "path"} -> the best matches, best first."""
+        request = _parse(payload)
+        query = str(request.get("query", ""))
+        count = int(request.get("count", DEFAULT_COUNT))
+        match request.get("by", "name"):
+            case "name":
+                return _to_json_lines(self.engine.get_best_name_matches(query, count))
+            case "path":
+                return _to_json_lines(self.engine.get_best_path_matches(query, count))
+            case by:
+                raise ValueError(f"can't query by {by}")
+
+    def top_n(self, payload: bytes) -> bytes:
+        """{"count": int} -> the most frecent applications."""
+        request = _parse(payload)
+        return _to_json_lines(self.engine.get_most_recent_applications(int(request.get("count", DEFAULT_COUNT))))
+
+    def launch(self, payload: bytes) -> bytes:
+        """{"id": str, "args": [str]} -> the launched application."""
+        request = _parse(payload)
+        if (app := self.engine.get_executable(request.get("id"))) is None:
+            raise KeyError(f"no application with id {request.get('id')}")
+        self.engine.launch(app, [str(arg) for arg in request.get("args", [])])
+        return _to_json_lines((app,))
+
+    def stats(self, payload: bytes) -> bytes:
+        """{"export": bool} -> the latency summary of every span, in microseconds; & the exported trace's path."""
+        request = _parse(payload)
+        records = [{"span": name, **summary} for name, summary in tracer.snapshot().items()]
+        if request.get("export", False):
+            records.append({"trace": str(tracer.export())})
+        return "".join(json.dumps(record) + "\n" for record in records).encode()
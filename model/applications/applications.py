@@ -1,30 +1,52 @@
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Callable, Optional, Literal
 
+from .catalogue import BINARY, DOTDESKTOP, TERMINAL, Catalogue, Row
+from ..launcher import compile_exec, expand_exec, launcher
 from globals import autostr
 
 
 @autostr
 class Application(ABC):
-    """Executable application."""
+    """Executable application; a lightweight view over a row of a Catalogue."""
+    __slots__ = ("_catalogue", "_row")
 
-    def __init__(self, opened_count: int = 0, last_opened_utc: float = .0, first_opened_utc: float = .0):
-        self.opened_count = opened_count
-        self.last_opened_utc = last_opened_utc
-        self.first_opened_utc = first_opened_utc
+    def __init__(self, catalogue: Catalogue | Row, row: int):
+        self._catalogue = catalogue
+        self._row = row
+
+    @classmethod
+    def view(cls, catalogue: Catalogue, row: int) -> "Application":
+        """A view over a row that's already in catalogue, e.g. a restored one."""
+        app = cls.__new__(cls)
+        app._catalogue = catalogue
+        app._row = row
+        return app
+
+    @property
+    def opened_count(self) -> int:
+        return self._catalogue.opened_counts[self._row]
+
+    @property
+    def last_opened_utc(self) -> Optional[float]:
+        return self._catalogue.timestamp(self._catalogue.last_opened[self._row])
+
+    @property
+    def first_opened_utc(self) -> Optional[float]:
+        return self._catalogue.timestamp(self._catalogue.first_opened[self._row])
 
     def update_opened_count_meta(self, count: int):
-        self.opened_count = count
+        self._catalogue.opened_counts[self._row] = count
         return self
 
-    def update_last_opened_utc_meta(self, last_opened: float):
-        self.last_opened_utc = last_opened
+    def update_last_opened_utc_meta(self, last_opened: Optional[float]):
+        self._catalogue.last_opened[self._row] = self._catalogue.column_timestamp(last_opened)
         return self
 
-    def update_first_opened_utc_meta(self, first_opened: float):
-        self.first_opened_utc = first_opened
+    def update_first_opened_utc_meta(self, first_opened: Optional[float]):
+        self._catalogue.first_opened[self._row] = self._catalogue.column_timestamp(first_opened)
         return self
 
     @abstractmethod
@@ -48,7 +70,8 @@ class Application(ABC):
         pass
 
     @abstractmethod
-    def run(self, args: list[str] = ""):
+    def run(self, args: list[str] = (), on_spawned: Optional[Callable[[int], None]] = None) -> int:
+        """Launch detached with args; returns the pid. See Launcher.spawn for on_spawned."""
         pass
 
     def convert_path_to_readable(self, s: str):
@@ -64,6 +87,7 @@ class Application(ABC):
 # TODO find a way to support snap packages
 @autostr
 class XDGDesktopApplication(Application):
+    __slots__ = ()
 
     def __init__(self,
                  dotdesktop_fp: Path | str,
@@ -72,36 +96,72 @@ class XDGDesktopApplication(Application):
                  df_icon: Optional[str],
                  opened_count: int = 0,
                  last_opened_utc: float = None,
-                 first_opened_utc: float = None
+                 first_opened_utc: float = None,
+                 catalogue: Optional[Catalogue] = None,
+                 df_terminal: bool = False,
+                 df_path: Optional[str] = None
                  ):
-        super().__init__(opened_count=opened_count, last_opened_utc=last_opened_utc, first_opened_utc=first_opened_utc)
-        self.dfp: str = str(dotdesktop_fp)
-        self.name: str = df_name
-        self.exec: str = df_exec
-        self.icon: str = df_icon
-
-        self.sanitized_exec = self.exec.split(" ")
+        row = (DOTDESKTOP, str(dotdesktop_fp), df_name, df_exec, df_icon, opened_count, last_opened_utc,
+               first_opened_utc, TERMINAL if df_terminal else 0, df_path)
+        # an application on its own gets a single row of its own, which goes away along with it
+        if catalogue is None:
+            super().__init__(Row(*row), 0)
+        else:
+            super().__init__(catalogue, catalogue.append(*row))
+
+    @property
+    def dfp(self) -> str:
+        return self._catalogue.strings[self._catalogue.paths[self._row]]
+
+    @property
+    def name(self) -> str:
+        return self._catalogue.strings[self._catalogue.names[self._row]]
+
+    @property
+    def exec(self) -> str:
+        return self._catalogue.strings[self._catalogue.execs[self._row]] or ""
+
+    @property
+    def icon(self) -> Optional[str]:
+        return self._catalogue.strings[self._catalogue.icons[self._row]]
+
+    @property
+    def terminal(self) -> bool:
+        return bool(self._catalogue.flags[self._row] & TERMINAL)
+
+    @property
+    def workdir(self) -> Optional[str]:
+        return self._catalogue.strings[self._catalogue.workdirs[self._row]]
+
+    @property
+    def sanitized_exec(self) -> list[str]:
+        # computed on demand; only the first token is needed for matching & display
+        return self.exec.split(" ")
+
+    def _exec_binary(self) -> str:
+        return self.exec.split(" ", 1)[0]
 
     def is_bin_path_exec(self):
-        return os.sep not in self.sanitized_exec[0]
+        return os.sep not in self._exec_binary()
 
     def get_application_type(self):
-        if "flatpak" in self.sanitized_exec[0]:
+        if "flatpak" in self._exec_binary():
             return "flatpak"
 
         return "dotdesktop"
 
     def get_icon(self):
-        pass
+        # a theme icon name or an absolute path, as written in the entry; see model.icons for resolving it
+        return self.icon
 
     def get_name(self):
         return self.name
 
     def get_full_path(self) -> str:
-        return self.sanitized_exec[0]
+        return self._exec_binary()
 
     def get_readable_path(self):
-        return self.convert_path_to_readable(self.sanitized_exec[0])
+        return self.convert_path_to_readable(self._exec_binary())
 
     def get_full_path_dfp(self):
         return self.dfp
@@ -109,22 +169,36 @@ class XDGDesktopApplication(Application):
     def get_readable_path_dfp(self):
         return self.convert_path_to_readable(self.dfp)
 
-    def run(self, args: list[str] = ""):
-        pass
+    def run(self, args: list[str] = (), on_spawned: Optional[Callable[[int], None]] = None) -> int:
+        return launcher.spawn(expand_exec(compile_exec(self.exec, self.name, self.icon, self.dfp), args), on_spawned,
+                              cwd=self.workdir, terminal=self.terminal)
 
 
 # TODO implement db saving https://www.tutorialspoint.com/peewee/peewee_update_existing_records.htm
 @autostr
 class PlainApplication(Application):
+    __slots__ = ()
 
     def __init__(self,
                  bin_path: str,
                  opened_count: int = 0,
                  last_opened_utc: float = None,
-                 first_opened_utc: float = None):
-        super().__init__(opened_count=opened_count, last_opened_utc=last_opened_utc, first_opened_utc=first_opened_utc)
-        self.path = bin_path
-        self.name = str(self.path).split(os.sep)[-1]
+                 first_opened_utc: float = None,
+                 catalogue: Optional[Catalogue] = None):
+        # the name is just the path's basename, so it's derived on demand rather than stored
+        row = (BINARY, bin_path, None, None, None, opened_count, last_opened_utc, first_opened_utc)
+        if catalogue is None:
+            super().__init__(Row(*row), 0)
+        else:
+            super().__init__(catalogue, catalogue.append(*row))
+
+    @property
+    def path(self) -> str:
+        return self._catalogue.strings[self._catalogue.paths[self._row]]
+
+    @property
+    def name(self) -> str:
+        return self.path.rsplit(os.sep, 1)[-1]
 
     def get_application_type(self) -> Literal["binary", "dotdesktop", "flatpak", "snap"]:
         return "binary"
@@ -141,5 +215,5 @@ class PlainApplication(Application):
     def get_readable_path(self):
         return self.convert_path_to_readable(self.path)
 
-    def run(self, args: list[str] = ""):
-        pass
+    def run(self, args: list[str] = (), on_spawned: Optional[Callable[[int], None]] = None) -> int:
+        return launcher.spawn([self.path, *args], on_spawned)
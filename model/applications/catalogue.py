@@ -0,0 +1,140 @@
+"""
+gRunner's columnar application store.
+Every Application is a two-slot view over a row of a Catalogue: strings are interned once in a shared table,
+ and everything else lives in typed arrays, which keeps the long-lived background process small & GC-friendly.
+Rows are never freed one by one, since views of removed applications may still be around; a catalogue is freed as
+ a whole instead, along with the last of its views, so every walk builds a fresh one. Applications built on their
+ own get a Row instead, which has the same columns for a single row.
+"""
+
+import math
+import threading
+from array import array
+from typing import Optional
+
+BINARY = 0
+DOTDESKTOP = 1
+
+# flags of a row
+TERMINAL = 1
+
+NO_STRING = 0
+NO_TIMESTAMP = math.nan
+
+
+class Catalogue:
+    def __init__(self):
+        # id 0 is reserved for "no string", so that optional columns fit in unsigned arrays
+        self.strings: list[Optional[str]] = [None]
+        self.string_ids: dict[str, int] = {}
+
+        self.kinds = array("B")
+        self.paths = array("I")
+        self.names = array("I")
+        self.execs = array("I")
+        self.icons = array("I")
+        self.flags = array("B")
+        self.workdirs = array("I")
+        self.opened_counts = array("q")
+        self.last_opened = array("d")
+        self.first_opened = array("d")
+
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __str__(self):
+        return f"Catalogue({len(self)} rows, {len(self.strings)} strings)"
+
+    def store(self, s: Optional[str]) -> int:
+        """Add a string that's (likely) unique, e.g. a path, skipping the interning bookkeeping."""
+        if s is None:
+            return NO_STRING
+        self.strings.append(s)
+        return len(self.strings) - 1
+
+    def intern(self, s: Optional[str]) -> int:
+        """Add a string that's shared by many rows, e.g. an icon name, storing it only once."""
+        if s is None:
+            return NO_STRING
+        if (i := self.string_ids.get(s)) is None:
+            i = self.string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def append(self, kind: int, path: str, name: Optional[str], exec_: Optional[str], icon: Optional[str],
+               opened_count: int, last_opened: Optional[float], first_opened: Optional[float],
+               flags: int = 0, workdir: Optional[str] = None) -> int:
+        """Add a row; rows are never reused, a fresh catalogue is built on every full walk instead."""
+        with self.lock:
+            row = len(self.kinds)
+            self.kinds.append(kind)
+            self.paths.append(self.store(path))
+            self.names.append(self.store(name))
+            self.execs.append(self.store(exec_))
+            self.icons.append(self.intern(icon))
+            self.flags.append(flags)
+            self.workdirs.append(self.intern(workdir))
+            self.opened_counts.append(opened_count)
+            self.last_opened.append(NO_TIMESTAMP if last_opened is None else last_opened)
+            self.first_opened.append(NO_TIMESTAMP if first_opened is None else first_opened)
+            return row
+
+    def columns(self) -> tuple:
+        """Everything the rows are made of, as restore takes it; e.g. to be pickled."""
+        with self.lock:
+            return (self.strings, self.string_ids, self.kinds, self.paths, self.names, self.execs, self.icons,
+                    self.flags, self.workdirs, self.opened_counts, self.last_opened, self.first_opened)
+
+    def restore(self, columns: tuple):
+        """Take over the rows of columns, as returned by columns(); only an empty catalogue can."""
+        with self.lock:
+            if len(self.kinds):
+                raise ValueError(f"can't restore rows into {self}")
+            (self.strings, self.string_ids, self.kinds, self.paths, self.names, self.execs, self.icons,
+             self.flags, self.workdirs, self.opened_counts, self.last_opened, self.first_opened) = columns
+
+    def string(self, i: int) -> Optional[str]:
+        return self.strings[i]
+
+    @staticmethod
+    def timestamp(value: float) -> Optional[float]:
+        return None if math.isnan(value) else value
+
+    @staticmethod
+    def column_timestamp(value: Optional[float]) -> float:
+        return NO_TIMESTAMP if value is None else value
+
+
+class Row:
+    """
+    A catalogue of a single row, for an application built on its own (e.g. in tests): the row is always 0, so the
+     string ids are the same for every row & shared, & only what an application may update is its own.
+    """
+    __slots__ = ("strings", "kinds", "flags", "opened_counts", "last_opened", "first_opened")
+
+    paths = (1,)
+    names = (2,)
+    execs = (3,)
+    icons = (4,)
+    workdirs = (5,)
+
+    def __init__(self, kind: int, path: str, name: Optional[str], exec_: Optional[str], icon: Optional[str],
+                 opened_count: int, last_opened: Optional[float], first_opened: Optional[float],
+                 flags: int = 0, workdir: Optional[str] = None):
+        self.strings = (None, path, name, exec_, icon, workdir)
+        self.kinds = (kind,)
+        self.flags = (flags,)
+        self.opened_counts = [opened_count]
+        self.last_opened = [NO_TIMESTAMP if last_opened is None else last_opened]
+        self.first_opened = [NO_TIMESTAMP if first_opened is None else first_opened]
+
+    def __len__(self):
+        return 1
+
+    def __str__(self):
+        return f"Row({self.strings[1]})"
+
+    timestamp = staticmethod(Catalogue.timestamp)
+    column_timestamp = staticmethod(Catalogue.column_timestamp)
@@ -1,43 +1,65 @@
 import os
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
-import desktop_entry_lib as dtl
 from loguru import logger
 
 from model import db
 from .applications import PlainApplication, Application, XDGDesktopApplication
-from globals import Global, autostr, timeit, Configuration
+from .catalogue import BINARY, DOTDESKTOP, Catalogue
+from .dotdesktop import desktop_entries
+from .snapshot import CatalogueDump, CatalogueSnapshot, DirectoryListing
+from globals import Global, autostr, Configuration
+from tracing import traced
 
 
 @autostr
 class ExecutableFile:
+    __slots__ = ("dir", "fname", "is_on_path", "_path")
 
     def __init__(self, directory: str, fname: str):
         self.dir = directory
         self.fname = fname
-        self.path = Path(self.dir, self.fname)
-        self.is_on_path = str(self.dir) in Global.PATH_VALUES
+        self.is_on_path = self.dir in Global.PATH_VALUES
+        self._path: Optional[str] = None
 
-    def get_path(self):
-        return self.path
+    def get_path(self) -> str:
+        # a walk asks for it several times per file
+        if self._path is None:
+            self._path = os.path.join(self.dir, self.fname)
+        return self._path
 
     def is_bin_in_path(self):
         return self.is_on_path
 
 
+class InlineExecutor(Executor):
+    """Runs every task on submission, in the calling thread; used for serial walks."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
 class Converter:
 
     @staticmethod
-    def convert_executable_to_application(ap: ExecutableFile):
-        return PlainApplication(str(ap.path))
+    def convert_executable_to_application(ap: ExecutableFile, catalogue: Optional[Catalogue] = None):
+        return PlainApplication(ap.get_path(), catalogue=catalogue)
 
     @staticmethod
-    def convert_dotdesktop_to_application(dp: Path) -> Optional[Application]:
-        df = dtl.DesktopEntry.from_file(dp)
-        if df.Type == "Application" and df.should_show():
-            return XDGDesktopApplication(dp, df.Name.get_translated_text(), df.Exec, df.Icon)
+    def convert_dotdesktop_to_application(dp: Path | str,
+                                          catalogue: Optional[Catalogue] = None) -> Optional[Application]:
+        df = desktop_entries.get(str(dp))
+        if df.type == "Application" and df.visible:
+            return XDGDesktopApplication(dp, df.name, df.exec, df.icon, catalogue=catalogue,
+                                         df_terminal=df.terminal, df_path=df.path)
         return None
 
 
@@ -54,11 +76,15 @@ class FSExecutableFinder(Finder):
     def __init__(self, cfg: Configuration):
         self.recursive: bool = cfg.get_recursive()
         self.paths: list[str] = cfg.get_paths()
+        self.workers: int = cfg.get_workers()
+        self.snapshot: Optional[CatalogueSnapshot] = None
 
     # noinspection PyTypeChecker
+    @traced("crawl.join")
     def _join_application_entries(self,
                                   executables: list[ExecutableFile],
-                                  dotdesktops: list[ExecutableFile]) -> dict[str, Application]:
+                                  dotdesktops: list[ExecutableFile],
+                                  catalogue: Catalogue) -> dict[str, Application]:
         # https://specifications.freedesktop.org/desktop-entry-spec/desktop-entry-spec-latest.html)
         # Note:
         # according to the freedesktop spec
@@ -70,65 +96,172 @@ class FSExecutableFinder(Finder):
         binary_applications: dict[str, PlainApplication] = {}
         dotdesktop_applications: dict[str, XDGDesktopApplication] = {}
         for d in dotdesktops:
-            if (dp := d.get_path()).exists():
-                if app := Converter.convert_dotdesktop_to_application(dp):
-                    dotdesktop_applications[str(dp)] = app
+            dp = d.get_path()
+            try:
+                if app := Converter.convert_dotdesktop_to_application(dp, catalogue):
+                    dotdesktop_applications[dp] = app
+            except OSError:
+                continue
 
         self._filter_xdg_from_binary_entries(executables, dotdesktop_applications.values())
 
+        # executables have already been checked with os.access (which implies they exist) while listing
         for a in executables:
-            if (dp := a.get_path()).exists():
-                binary_applications[str(dp)] = Converter.convert_executable_to_application(a)
+            app = Converter.convert_executable_to_application(a, catalogue)
+            binary_applications[app.get_full_path()] = app
 
         return binary_applications | dotdesktop_applications
 
+    @traced("crawl.filter_xdg")
     def _filter_xdg_from_binary_entries(self,
                                         executable: list[ExecutableFile],
-                                        xdg_applications: list[XDGDesktopApplication]):
-        common_bins: list[ExecutableFile] = []
-        for xdg in xdg_applications:
-            for binary in executable:
-                if xdg.get_full_path() == binary.fname and binary.is_on_path \
-                        or xdg.get_full_path() == str(binary.get_path()):
-                    if binary not in common_bins:
-                        common_bins.append(binary)
-                    break
-
-        for binary in common_bins:
-            executable.remove(binary)
-
-    def _walk_path(self, path: Path) -> tuple[list[ExecutableFile], list[ExecutableFile]]:
-        executable: list[ExecutableFile] = []
-        dotdesktop: list[ExecutableFile] = []
-
-        for current_path, _, files in os.walk(path):
-            for file in files:
-                if file.endswith(".desktop"):
-                    dotdesktop.append(ExecutableFile(current_path, file))
-                    continue
-
-                fp = Path(current_path, file)
-                if os.access(fp, os.X_OK):
-                    executable.append(ExecutableFile(current_path, file))
-
-            if not self.recursive:
-                break
-
-        return executable, dotdesktop
-
-    @timeit
-    def walk(self) -> dict[str, Application]:
-        executables: list[ExecutableFile] = []
-        dotdesktops: list[ExecutableFile] = []
+                                        xdg_applications: Iterable[XDGDesktopApplication]):
+        # a binary is hidden by a desktop entry that executes it either by name (if the binary is on $PATH),
+        #  or by absolute path; every entry hides only the first such binary, in walk order
+        by_name: dict[str, int] = {}
+        by_path: dict[str, int] = {}
+        for i, binary in enumerate(executable):
+            if binary.is_on_path:
+                by_name.setdefault(binary.fname, i)
+            by_path.setdefault(binary.get_path(), i)
+
+        common_bins: set[int] = set()
+        for target in {xdg.get_full_path() for xdg in xdg_applications}:
+            first = min(by_name.get(target, len(executable)), by_path.get(target, len(executable)))
+            if first < len(executable):
+                common_bins.add(first)
+
+        if common_bins:
+            executable[:] = [binary for i, binary in enumerate(executable) if i not in common_bins]
+
+    def _list_directory(self, directory: str, cached: Optional[DirectoryListing]) -> Optional[DirectoryListing]:
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+        # any file being created, removed or renamed in the directory bumps its mtime
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+
+        listing = DirectoryListing(mtime_ns, [], [], [])
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        # same as os.walk, symlinked directories are not followed
+                        if not entry.is_symlink():
+                            listing.subdirectories.append(entry.name)
+                        continue
+
+                    if entry.name.endswith(".desktop"):
+                        listing.dotdesktops.append(entry.name)
+                        continue
+
+                    if os.access(entry.path, os.X_OK):
+                        listing.executables.append(entry.name)
+        except OSError as e:
+            logger.warning(f"couldn't list {directory}, got exception {e}")
+            return None
+
+        return listing
+
+    def _list_tree(self, executor: Executor, directory: str) \
+            -> tuple[str, Optional[DirectoryListing], list[Future]]:
+        listing = self._list_directory(directory, self.snapshot.directories.get(directory))
+        children: list[Future] = []
+        if self.recursive and listing is not None:
+            # fan out straight away; only the caller ever waits on futures, so workers can't deadlock each other
+            children = [executor.submit(self._list_tree, executor, os.path.join(directory, d))
+                        for d in listing.subdirectories]
+        return directory, listing, children
+
+    @traced("crawl.walk_path")
+    def _walk_path(self, root: Future, listings: dict[str, DirectoryListing]) -> list[tuple[str, DirectoryListing]]:
+        visited: list[tuple[str, DirectoryListing]] = []
+
+        # merge top-down & depth-first, the same order os.walk yields, regardless of which worker finished first
+        pending: list[Future] = [root]
+        while pending:
+            current_path, listing, children = pending.pop().result()
+            if listing is None:
+                continue
+            listings[current_path] = listing
+            visited.append((current_path, listing))
 
-        for p in self.paths:
-            path = Path(p)
-            if path.exists() and path.is_dir():
-                p, g = self._walk_path(path)
-                executables += p
-                dotdesktops += g
+            pending += reversed(children)
 
-        return self._join_application_entries(executables, dotdesktops)
+        return visited
+
+    @staticmethod
+    @traced("crawl.restore")
+    def _restore(dump: CatalogueDump, catalogue: Catalogue) -> dict[str, Application]:
+        catalogue.restore(dump.columns)
+        desktop_entries.keep(dump.dotdesktops)
+        views = {BINARY: PlainApplication.view, DOTDESKTOP: XDGDesktopApplication.view}
+        strings, paths, kinds = catalogue.strings, catalogue.paths, catalogue.kinds
+        return {strings[paths[row]]: views[kinds[row]](catalogue, row) for row in dump.rows}
+
+    @staticmethod
+    def _stat_dotdesktops(dotdesktops: list[ExecutableFile]) -> dict[str, Optional[tuple[int, int]]]:
+        stats: dict[str, Optional[tuple[int, int]]] = {}
+        for d in dotdesktops:
+            try:
+                st = os.stat(d.get_path())
+                stats[d.get_path()] = st.st_mtime_ns, st.st_size
+            except OSError:
+                stats[d.get_path()] = None
+        return stats
+
+    @traced("crawl.walk")
+    def walk(self, catalogue: Optional[Catalogue] = None, rescan: bool = False) -> dict[str, Application]:
+        """Every application under the configured paths; rescan lists every directory, whatever the snapshot has."""
+        catalogue = Catalogue() if catalogue is None else catalogue
+        if rescan:
+            self.snapshot = CatalogueSnapshot()
+        elif self.snapshot is None:
+            self.snapshot = CatalogueSnapshot.load()
+
+        visited: list[tuple[str, DirectoryListing]] = []
+        listings: dict[str, DirectoryListing] = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawler") \
+            if self.workers > 1 else InlineExecutor()
+        with executor:
+            roots = [executor.submit(self._list_tree, executor, p) for p in self.paths if os.path.isdir(p)]
+            for root in roots:
+                visited += self._walk_path(root, listings)
+
+        previous = self.snapshot
+        self.snapshot = CatalogueSnapshot(listings)
+        changed = listings.keys() != previous.directories.keys() \
+            or any(listing is not previous.directories[d] for d, listing in listings.items())
+        if changed:
+            try:
+                self.snapshot.dump()
+            except OSError as e:
+                logger.warning(f"couldn't save catalogue snapshot, got exception {e}")
+
+        # the dump's rows are only ever restored into, & taken from, a catalogue of their own
+        dumpable = not len(catalogue)
+        key = (tuple(self.paths), tuple(Global.PATH_VALUES),
+               tuple((d, listing.mtime_ns) for d, listing in listings.items()))
+        if not changed and dumpable and (dump := CatalogueDump.load()) is not None and dump.is_fresh(key):
+            return self._restore(dump, catalogue)
+
+        executables = [ExecutableFile(d, file) for d, listing in visited for file in listing.executables]
+        dotdesktops = [ExecutableFile(d, file) for d, listing in visited for file in listing.dotdesktops]
+        # stat before parsing, so that an entry changed in between is found stale by the next walk
+        stats = self._stat_dotdesktops(dotdesktops) if dumpable else {}
+        applications = self._join_application_entries(executables, dotdesktops, catalogue)
+
+        if dumpable:
+            try:
+                CatalogueDump(key, stats, catalogue.columns(), [app._row for app in applications.values()]).dump()
+            except OSError as e:
+                logger.warning(f"couldn't save catalogue dump, got exception {e}")
+
+        return applications
 
 
 @autostr
@@ -139,44 +272,44 @@ class DBExecutableFinder(Finder):
     def _file_exists(self, filename) -> bool:
         return os.path.exists(filename)
 
-    def _create_app_from_db_instance(self, instance: db.Application) -> Application:
-        if not self._file_exists(instance.path):
-            raise FileNotFoundError
-
-        if ".desktop" not in instance.path:
-            return PlainApplication(instance.path, instance.opened_count, instance.last_opened, instance.first_opened)
-
-        return Converter.convert_dotdesktop_to_application(instance.path) \
-            .update_opened_count_meta(instance.opened_count) \
-            .update_last_opened_utc_meta(instance.last_opened) \
-            .update_first_opened_utc_meta(instance.first_opened)
-
-    def walk(self) -> dict[str, Application]:
-        db_apps: dict[str, Application] = {}
+    def _create_app_from_db_row(self, row: db.UsageRow, catalogue: Catalogue) -> Application:
+        path, opened_count, last_opened, first_opened = row
+        if not self._file_exists(path):
+            raise FileNotFoundError(path)
+
+        if ".desktop" not in path:
+            return PlainApplication(path, opened_count, last_opened, first_opened, catalogue=catalogue)
+
+        if (app := Converter.convert_dotdesktop_to_application(path, catalogue)) is None:
+            raise FileNotFoundError(f"{path} is no longer a visible application")
+        return app \
+            .update_opened_count_meta(opened_count) \
+            .update_last_opened_utc_meta(last_opened) \
+            .update_first_opened_utc_meta(first_opened)
+
+    @traced("db.merge")
+    def merge(self, executables: dict[str, Application],
+              catalogue: Optional[Catalogue] = None) -> dict[str, Application]:
+        """
+        Attach the usage statistics of every known application to executables (in place), from a single query.
+        New objects are only created for applications the DB knows about, but that executables doesn't contain.
+        """
+        catalogue = Catalogue() if catalogue is None else catalogue
+        for row in db.get_usage_rows():
+            path, opened_count, last_opened, first_opened = row
+            if (app := executables.get(path)) is not None:
+                app.update_opened_count_meta(opened_count) \
+                    .update_last_opened_utc_meta(last_opened) \
+                    .update_first_opened_utc_meta(first_opened)
+                continue
 
-        app: db.Application
-        for app in db.Application.select():
             try:
-                db_apps[app.path] = self._create_app_from_db_instance(app)
-            except FileNotFoundError as e:
+                executables[path] = self._create_app_from_db_row(row, catalogue)
+            except OSError as e:
                 logger.warning(e)
                 continue
 
-        return db_apps
+        return executables
 
-    def walk_by_frequency(self, count) -> list[str]:
-        """Get paths of the most frequent N applications. """
-        db_apps: list[str] = []
-
-        app: db.Application
-        for app in db.Application.select().order_by(db.Application.opened_count.desc()):
-            if not self._file_exists(app.path):
-                logger.debug(f"file not found: {app.path}")
-                continue
-
-            db_apps.append(app.path)
-
-            if len(db_apps) == count:
-                break
-
-        return db_apps
+    def walk(self) -> dict[str, Application]:
+        return self.merge({})
@@ -0,0 +1,100 @@
+"""
+gRunner's parsed desktop entry cache.
+Parsing a .desktop file is by far the most expensive part of a walk, so the handful of fields gRunner needs are
+ kept in memory & on disk, keyed by the file's (path, mtime, size); unchanged files are never re-read.
+"""
+
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+import desktop_entry_lib as dtl
+from loguru import logger
+
+from globals import Global
+from tracing import tracer
+
+
+class DesktopEntryFields(NamedTuple):
+    name: str
+    exec: Optional[str]
+    icon: Optional[str]
+    type: Optional[str]
+    visible: bool
+    # run in a terminal emulator, & the working directory to run in
+    terminal: bool
+    path: Optional[str]
+
+
+class DesktopEntryCache:
+    # bump whenever DesktopEntryFields changes; stale caches are simply discarded
+    VERSION = 2
+
+    def __init__(self, path: Path = Global.DESKTOP_CACHE):
+        self.path = path
+        self.entries: Optional[dict[str, tuple[int, int, DesktopEntryFields]]] = None
+        # paths requested since the last dump; anything else is pruned when dumping
+        self.touched: set[str] = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def _load(self):
+        self.entries = {}
+        try:
+            with self.path.open(mode="rb") as f:
+                version, entries = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"couldn't load desktop entry cache {self.path}, got exception {e}")
+            return
+
+        if version == DesktopEntryCache.VERSION:
+            self.entries = entries
+
+    def get(self, dp: str) -> DesktopEntryFields:
+        """Fields of the desktop entry at dp, parsing it only if it changed; raises OSError if it can't be read."""
+        st = os.stat(dp)
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            self.touched.add(dp)
+            if (cached := self.entries.get(dp)) is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                return cached[2]
+
+        with tracer.span("dotdesktop.parse", path=dp):
+            df = dtl.DesktopEntry.from_file(dp)
+            fields = DesktopEntryFields(df.Name.get_translated_text(), df.Exec, df.Icon, df.Type, df.should_show(),
+                                        bool(df.Terminal), df.Path or None)
+        with self.lock:
+            self.entries[dp] = (st.st_mtime_ns, st.st_size, fields)
+            self.dirty = True
+        return fields
+
+    def keep(self, dps: Iterable[str]):
+        """Keep the entries of dps at the next dump, without reading them; for walks that didn't need to."""
+        with self.lock:
+            self.touched.update(dps)
+
+    def dump(self):
+        with self.lock:
+            if self.entries is None:
+                return
+            if self.dirty or self.touched != self.entries.keys():
+                self.entries = {dp: entry for dp, entry in self.entries.items() if dp in self.touched}
+                # write & rename, so a crash mid-dump never leaves a truncated cache behind
+                tmp = self.path.with_suffix(".tmp")
+                try:
+                    with tmp.open(mode="wb") as f:
+                        pickle.dump((DesktopEntryCache.VERSION, self.entries), f, pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp, self.path)
+                except OSError as e:
+                    logger.warning(f"couldn't save desktop entry cache, got exception {e}")
+            self.dirty = False
+            self.touched = set()
+
+
+# shared by every finder & the engine, so each file is parsed at most once per change
+desktop_entries = DesktopEntryCache()
@@ -0,0 +1,111 @@
+"""
+gRunner's on-disk catalogue snapshot.
+Stores the raw listing of every crawled directory (keyed by its mtime), so that a cold start only has to rescan
+ the directories that changed since the last walk; parsed desktop entries live in the desktop entry cache.
+The catalogue the last walk built is dumped as well, along with the mtimes of the directories & the (mtime, size) of
+ the desktop entries it was built from, so that a walk that finds none of them changed loads it as it is.
+A file's mode isn't part of its directory's mtime, so a chmod +x (or -x) of a file that's already there goes unseen
+ by snapshot walks until something else touches the directory; while gRunner runs, the watcher catches it anyway,
+ & a reload always rescans every directory.
+"""
+
+import os
+import pickle
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from globals import Global, autostr
+
+
+@autostr
+class DirectoryListing:
+    def __init__(self, mtime_ns: int, executables: list[str], dotdesktops: list[str], subdirectories: list[str]):
+        self.mtime_ns = mtime_ns
+        self.executables = executables
+        self.dotdesktops = dotdesktops
+        self.subdirectories = subdirectories
+
+
+@autostr
+class CatalogueSnapshot:
+    # bump whenever the pickled layout changes; stale snapshots are simply discarded
+    VERSION = 2
+
+    def __init__(self, directories: dict[str, DirectoryListing] = None):
+        self.directories: dict[str, DirectoryListing] = directories if directories is not None else {}
+
+    @staticmethod
+    def load(path: Path = Global.SNAPSHOT) -> "CatalogueSnapshot":
+        try:
+            with path.open(mode="rb") as f:
+                version, directories = pickle.load(f)
+        except FileNotFoundError:
+            return CatalogueSnapshot()
+        except Exception as e:
+            logger.warning(f"couldn't load catalogue snapshot {path}, got exception {e}")
+            return CatalogueSnapshot()
+
+        if version != CatalogueSnapshot.VERSION:
+            logger.debug(f"discarding catalogue snapshot version {version}")
+            return CatalogueSnapshot()
+        return CatalogueSnapshot(directories)
+
+    def dump(self, path: Path = Global.SNAPSHOT):
+        # write & rename, so a crash mid-dump never leaves a truncated snapshot behind
+        tmp = path.with_suffix(".tmp")
+        with tmp.open(mode="wb") as f:
+            pickle.dump((CatalogueSnapshot.VERSION, self.directories), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+@autostr
+class CatalogueDump:
+    """The columns of a catalogue a walk built, its rows in the walk's order & what they were built from."""
+    # bump whenever the pickled layout (or the catalogue's columns) changes; stale dumps are simply discarded
+    VERSION = 2
+
+    def __init__(self, key: tuple, dotdesktops: dict[str, Optional[tuple[int, int]]], columns: tuple, rows: list[int]):
+        self.key = key
+        self.dotdesktops = dotdesktops
+        self.columns = columns
+        self.rows = rows
+
+    def is_fresh(self, key: tuple) -> bool:
+        """Whether the dump was built from key, & every desktop entry is just as it was."""
+        if key != self.key:
+            return False
+        for dp, stat in self.dotdesktops.items():
+            try:
+                st = os.stat(dp)
+                current = st.st_mtime_ns, st.st_size
+            except OSError:
+                current = None
+            if current != stat:
+                return False
+        return True
+
+    @staticmethod
+    def load(path: Path = Global.CATALOGUE_DUMP) -> Optional["CatalogueDump"]:
+        try:
+            with path.open(mode="rb") as f:
+                version, dump = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"couldn't load catalogue dump {path}, got exception {e}")
+            return None
+
+        if version != CatalogueDump.VERSION:
+            logger.debug(f"discarding catalogue dump version {version}")
+            return None
+        return CatalogueDump(*dump)
+
+    def dump(self, path: Path = Global.CATALOGUE_DUMP):
+        # write & rename, so a crash mid-dump never leaves a truncated dump behind
+        tmp = path.with_name(f"{path.name}.tmp")
+        with tmp.open(mode="wb") as f:
+            pickle.dump((CatalogueDump.VERSION, (self.key, self.dotdesktops, self.columns, self.rows)), f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
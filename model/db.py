@@ -3,13 +3,30 @@ gRunner's database module.
 CFKs have been duplicated due to limitations of peewee.
 Store like this:
     https://docs.peewee-orm.com/en/latest/peewee/quickstart.html#storing-data
+Writes never happen on the caller's thread: events are queued to the write-behind writer, which coalesces them
+ into batched upserts, committed in a single transaction per flush.
 """
 
+import atexit
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
 import peewee as p
+from loguru import logger
 
 from globals import Global
 
-_db = p.SqliteDatabase(Global.DB)
+_db = p.SqliteDatabase(Global.DB, pragmas={
+    # readers never wait on the writer, & commits only fsync on checkpoints
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -8 * 1024,
+    "temp_store": "memory",
+})
 
 
 class DBrunner(p.Model):
@@ -23,6 +40,12 @@ class Application(DBrunner):
     last_opened = p.TimestampField(resolution=6, utc=True, null=True)
     first_opened = p.TimestampField(resolution=6, utc=True, null=True)
 
+    class Meta:
+        # serves the "most used" ordering straight from the index, rather than sorting the whole table
+        indexes = (
+            (('opened_count', 'last_opened'), False),
+        )
+
 
 class UserSession(DBrunner):
     # NOTE:
@@ -50,4 +73,371 @@ class ApplicationSession(DBrunner):
         primary_key = p.CompositeKey('path', 'time_started', 'heartbeat')
 
 
-_db.create_tables([Application, UserSession, ApplicationSession])
+class ApplicationUsageRollup(DBrunner):
+    """Heartbeats of an application, compacted into a time bucket of the given resolution (in seconds)."""
+    path = p.CharField(null=False)
+    resolution = p.IntegerField(null=False)
+    # start of the bucket, UTC epoch seconds
+    bucket = p.IntegerField(null=False)
+    samples = p.IntegerField(null=False)
+    memory_max = p.IntegerField(null=False)
+    memory_sum = p.IntegerField(null=False)
+    process_count_max = p.IntegerField(null=False)
+    process_count_sum = p.IntegerField(null=False)
+    # seconds spent running, summed over every session of the bucket
+    runtime = p.FloatField(null=False)
+
+    class Meta:
+        primary_key = p.CompositeKey('path', 'resolution', 'bucket')
+        indexes = (
+            (('resolution', 'bucket'), False),
+        )
+
+
+class RollupWatermark(DBrunner):
+    # everything before watermark (UTC epoch seconds) has already been rolled up into this resolution
+    resolution = p.IntegerField(primary_key=True)
+    watermark = p.IntegerField(null=False)
+
+
+_db.create_tables([Application, UserSession, ApplicationSession, ApplicationUsageRollup, RollupWatermark])
+
+# (path, opened_count, last_opened, first_opened), timestamps as UTC epoch seconds
+UsageRow = tuple[str, int, Optional[float], Optional[float]]
+
+
+def to_utc_timestamp(dt: Optional[datetime]) -> Optional[float]:
+    # utc TimestampFields are read back as naive UTC datetimes
+    return dt.replace(tzinfo=timezone.utc).timestamp() if dt is not None else None
+
+
+def get_usage_rows() -> list[UsageRow]:
+    """Usage statistics of every known application, in a single query."""
+    query = Application.select(
+        Application.path, Application.opened_count, Application.last_opened, Application.first_opened
+    ).tuples()
+    return [(path, count, to_utc_timestamp(last), to_utc_timestamp(first)) for path, count, last, first in query]
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# how long every resolution is kept around, in seconds
+RAW_RETENTION = 2 * DAY
+HOURLY_RETENTION = 90 * DAY
+DAILY_RETENTION = 2 * 365 * DAY
+# heartbeats may trail the wall clock by a flush or so; buckets are only closed once they're this old
+ROLLUP_GRACE = 60
+_MICROSECONDS = 1_000_000
+
+
+class UsageStats(NamedTuple):
+    path: str
+    bucket: int
+    samples: int
+    memory_avg: float
+    memory_max: int
+    process_count_avg: float
+    process_count_max: int
+    runtime: float
+
+
+def _get_watermark(resolution: int) -> int:
+    row = RollupWatermark.get_or_none(RollupWatermark.resolution == resolution)
+    return row.watermark if row is not None else 0
+
+
+def _set_watermark(resolution: int, watermark: int):
+    RollupWatermark.replace(resolution=resolution, watermark=watermark).execute()
+
+
+def _upsert_rollup(query: p.Select):
+    R = ApplicationUsageRollup
+    R.insert_from(query, fields=[
+        R.path, R.resolution, R.bucket, R.samples, R.memory_max, R.memory_sum,
+        R.process_count_max, R.process_count_sum, R.runtime
+    ]).on_conflict(
+        conflict_target=[R.path, R.resolution, R.bucket],
+        update={
+            R.samples: R.samples + p.EXCLUDED.samples,
+            R.memory_max: p.fn.MAX(R.memory_max, p.EXCLUDED.memory_max),
+            R.memory_sum: R.memory_sum + p.EXCLUDED.memory_sum,
+            R.process_count_max: p.fn.MAX(R.process_count_max, p.EXCLUDED.process_count_max),
+            R.process_count_sum: R.process_count_sum + p.EXCLUDED.process_count_sum,
+            R.runtime: R.runtime + p.EXCLUDED.runtime,
+        }
+    ).execute()
+
+
+def _rollup_heartbeats(now: float):
+    """Compact every complete hour of raw heartbeats into hourly buckets."""
+    start = _get_watermark(HOUR)
+    end = int(now - ROLLUP_GRACE) // HOUR * HOUR
+    if end <= start:
+        return
+
+    S = ApplicationSession
+    # first per session & bucket, so that runtime is the span covered by each session's heartbeats
+    per_session = S.select(
+        S.path,
+        # literals, so that peewee doesn't convert the divisor as if it was a timestamp
+        (S.heartbeat / p.SQL(str(HOUR * _MICROSECONDS)) * p.SQL(str(HOUR))).alias("bucket"),
+        p.fn.COUNT(S.heartbeat).alias("samples"),
+        p.fn.MAX(S.total_memory_usage).alias("memory_max"),
+        p.fn.SUM(S.total_memory_usage).alias("memory_sum"),
+        p.fn.MAX(S.process_count).alias("process_count_max"),
+        p.fn.SUM(S.process_count).alias("process_count_sum"),
+        ((p.fn.MAX(S.heartbeat) - p.fn.MIN(S.heartbeat)) / p.SQL(f"{_MICROSECONDS:.1f}")).alias("runtime"),
+    ).where(
+        (S.heartbeat >= start) & (S.heartbeat < end)
+    ).group_by(S.path, S.time_started, p.SQL("bucket")).alias("s")
+
+    c = per_session.c
+    _upsert_rollup(p.Select([per_session], [
+        c.path, p.Value(HOUR), c.bucket, p.fn.SUM(c.samples), p.fn.MAX(c.memory_max), p.fn.SUM(c.memory_sum),
+        p.fn.MAX(c.process_count_max), p.fn.SUM(c.process_count_sum), p.fn.SUM(c.runtime)
+    ]).group_by(c.path, c.bucket))
+    _set_watermark(HOUR, end)
+
+
+def _rollup_hourly(now: float):
+    """Compact every complete day of hourly buckets into daily buckets."""
+    start = _get_watermark(DAY)
+    end = min(_get_watermark(HOUR), int(now - ROLLUP_GRACE)) // DAY * DAY
+    if end <= start:
+        return
+
+    R = ApplicationUsageRollup
+    _upsert_rollup(R.select(
+        R.path, p.Value(DAY), (R.bucket / DAY * DAY).alias("day"), p.fn.SUM(R.samples), p.fn.MAX(R.memory_max),
+        p.fn.SUM(R.memory_sum), p.fn.MAX(R.process_count_max), p.fn.SUM(R.process_count_sum), p.fn.SUM(R.runtime)
+    ).where(
+        (R.resolution == HOUR) & (R.bucket >= start) & (R.bucket < end)
+    ).group_by(R.path, p.SQL("day")))
+    _set_watermark(DAY, end)
+
+
+def _apply_retention(now: float):
+    # raw heartbeats are only dropped once they've been rolled up, no matter how old they are
+    raw_cutoff = min(now - RAW_RETENTION, _get_watermark(HOUR))
+    ApplicationSession.delete().where(ApplicationSession.heartbeat < raw_cutoff).execute()
+
+    R = ApplicationUsageRollup
+    hourly_cutoff = min(now - HOURLY_RETENTION, _get_watermark(DAY))
+    R.delete().where((R.resolution == HOUR) & (R.bucket < hourly_cutoff)).execute()
+    R.delete().where((R.resolution == DAY) & (R.bucket < now - DAILY_RETENTION)).execute()
+
+
+def compact(now: float = None):
+    """Roll heartbeats up into hourly & daily buckets, and drop whatever is past its retention."""
+    now = time.time() if now is None else now
+    with _db.atomic():
+        _rollup_heartbeats(now)
+        _rollup_hourly(now)
+        _apply_retention(now)
+
+
+def get_usage_history(since: float, path: Optional[str] = None, resolution: int = HOUR) -> list[UsageStats]:
+    """Per-bucket usage of one (or every) application since the given UTC epoch seconds, oldest first."""
+    R = ApplicationUsageRollup
+    query = R.select(
+        R.path, R.bucket, R.samples, R.memory_sum, R.memory_max, R.process_count_sum, R.process_count_max, R.runtime
+    ).where((R.resolution == resolution) & (R.bucket >= int(since) // resolution * resolution))
+    if path is not None:
+        query = query.where(R.path == path)
+
+    return [
+        UsageStats(path, bucket, samples, memory_sum / samples, memory_max, process_count_sum / samples,
+                   process_count_max, runtime)
+        for path, bucket, samples, memory_sum, memory_max, process_count_sum, process_count_max, runtime
+        in query.order_by(R.bucket).tuples()
+    ]
+
+
+def get_usage_summary(since: float, count: int) -> list[UsageStats]:
+    """
+    Usage of the count longest-running applications since the given UTC epoch seconds, aggregated per app; from the
+     daily buckets as far as they go, & from the hourly ones of the days that aren't complete yet, such as today.
+    """
+    R = ApplicationUsageRollup
+    since = int(since)
+    days_end = _get_watermark(DAY)
+    samples = p.fn.SUM(R.samples)
+    runtime = p.fn.SUM(R.runtime)
+    query = R.select(
+        R.path, p.fn.MIN(R.bucket), samples, p.fn.SUM(R.memory_sum), p.fn.MAX(R.memory_max),
+        p.fn.SUM(R.process_count_sum), p.fn.MAX(R.process_count_max), runtime
+    ).where(
+        ((R.resolution == DAY) & (R.bucket >= since // DAY * DAY) & (R.bucket < days_end))
+        | ((R.resolution == HOUR) & (R.bucket >= max(since // HOUR * HOUR, days_end)))
+    ).group_by(R.path).order_by(runtime.desc()).limit(count)
+
+    return [
+        UsageStats(path, bucket, samples, memory_sum / samples, memory_max, process_count_sum / samples,
+                   process_count_max, runtime)
+        for path, bucket, samples, memory_sum, memory_max, process_count_sum, process_count_max, runtime
+        in query.tuples()
+    ]
+
+
+class LaunchEvent(NamedTuple):
+    path: str
+    timestamp: float
+
+
+class UserSessionEvent(NamedTuple):
+    path: str
+    time_started: float
+    time_ended: Optional[float] = None
+
+
+class HeartbeatEvent(NamedTuple):
+    path: str
+    time_started: float
+    heartbeat: float
+    total_memory_usage: int
+    process_count: int
+
+
+Event = LaunchEvent | UserSessionEvent | HeartbeatEvent
+
+
+class WriteBehindWriter:
+    """Dedicated writer thread; callers only ever enqueue, so they never block on the disk."""
+
+    def __init__(self, flush_interval: float = 1., max_batch: int = 8192, compact_interval: float = 10 * 60):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # rollups run on the writer as well, so that there's only ever a single writer
+        self.compact_interval = compact_interval
+        self.next_compaction = time.monotonic()
+        self.queue: queue.SimpleQueue[Optional[Event | threading.Event]] = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def put(self, event: Event):
+        if self.thread is None:
+            self.start()
+        self.queue.put(event)
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything queued so far has been committed."""
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self):
+        with self.lock:
+            if self.thread is None:
+                return
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _loop(self):
+        while True:
+            batch: list[Event] = []
+            waiters: list[threading.Event] = []
+            stopping = False
+
+            if time.monotonic() >= self.next_compaction:
+                self.next_compaction = time.monotonic() + self.compact_interval
+                try:
+                    compact()
+                except Exception as e:
+                    logger.error(f"couldn't compact heartbeats, got exception {e}")
+
+            # block for the first event (or until the next compaction), then keep collecting for up to flush_interval
+            try:
+                item = self.queue.get(timeout=max(0., self.next_compaction - time.monotonic()))
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch or (remaining := deadline - time.monotonic()) <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(f"couldn't write {len(batch)} events, got exception {e}")
+            for waiter in waiters:
+                waiter.set()
+            if stopping:
+                _db.close()
+                return
+
+    @staticmethod
+    def _write(batch: list[Event]):
+        # coalesce: one upsert row per application, one row per user session
+        launches: dict[str, list] = {}
+        sessions: dict[tuple[str, float], Optional[float]] = {}
+        heartbeats: dict[tuple[str, float, float], HeartbeatEvent] = {}
+        for event in batch:
+            match event:
+                case LaunchEvent(path, timestamp):
+                    if (launch := launches.get(path)) is None:
+                        launches[path] = [1, timestamp, timestamp]
+                    else:
+                        launch[0] += 1
+                        launch[1] = max(launch[1], timestamp)
+                        launch[2] = min(launch[2], timestamp)
+                case UserSessionEvent(path, time_started, time_ended):
+                    if time_ended is not None or (path, time_started) not in sessions:
+                        sessions[(path, time_started)] = time_ended
+                case HeartbeatEvent(path, time_started, heartbeat, _, _):
+                    heartbeats[(path, time_started, heartbeat)] = event
+
+        with _db.atomic():
+            for rows in p.chunked(((path, *launch) for path, launch in launches.items()), 256):
+                Application.insert_many(
+                    rows, fields=[Application.path, Application.opened_count,
+                                  Application.last_opened, Application.first_opened]
+                ).on_conflict(
+                    conflict_target=[Application.path],
+                    update={
+                        Application.opened_count: Application.opened_count + p.EXCLUDED.opened_count,
+                        Application.last_opened: p.EXCLUDED.last_opened,
+                        Application.first_opened: p.fn.COALESCE(Application.first_opened, p.EXCLUDED.first_opened),
+                    }
+                ).execute()
+
+            for rows in p.chunked(((path, started, ended) for (path, started), ended in sessions.items()), 256):
+                UserSession.insert_many(
+                    rows, fields=[UserSession.path, UserSession.time_started, UserSession.time_ended]
+                ).on_conflict(
+                    conflict_target=[UserSession.path, UserSession.time_started],
+                    update={UserSession.time_ended: p.fn.COALESCE(p.EXCLUDED.time_ended, UserSession.time_ended)}
+                ).execute()
+
+            for rows in p.chunked(heartbeats.values(), 128):
+                ApplicationSession.insert_many(
+                    rows, fields=[ApplicationSession.path, ApplicationSession.time_started,
+                                  ApplicationSession.heartbeat, ApplicationSession.total_memory_usage,
+                                  ApplicationSession.process_count]
+                ).on_conflict_ignore().execute()
+
+
+# the process-wide writer; started on the first event
+writer = WriteBehindWriter()
@@ -1,55 +1,286 @@
-from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
-from .applications.applications import Application
-from .applications.crawler import DBExecutableFinder, FSExecutableFinder
-from globals import timeit, Configuration
+from loguru import logger
+
+from .applications.applications import Application, PlainApplication, XDGDesktopApplication
+from . import db
+from .applications.catalogue import Catalogue
+from .applications.dotdesktop import desktop_entries
+from .applications.crawler import Converter, DBExecutableFinder, ExecutableFile, FSExecutableFinder
+from .frecency import FrecencyIndex
+from .icons import icon_index
+from .launcher import launcher
+from .search import SearchIndex, SearchSession
+from .telemetry import sampler
+from globals import Global, Configuration
+from tracing import traced
+
+# rows of removed applications tolerated in the catalogue, as a share of the live ones, before a walk rebuilds it
+COMPACTION_RATIO = .5
 
 
 class Engine:
     def __init__(self, cfg: Configuration):
+        self.__catalogue: Optional[Catalogue] = None
         self.__executables: Optional[dict[str, Application]] = None
+        self.__name_index: Optional[SearchIndex] = None
+        self.__path_index: Optional[SearchIndex] = None
+        self.__frecency: Optional[FrecencyIndex] = None
+        # executables referenced by .desktop entries, which hide the matching binaries
+        self.__xdg_execs: Counter = Counter()
+        self.__lock = threading.RLock()
+        # events applied while a walk is under way, which the walk may have seen or not; replayed onto its result
+        self.__pending: Optional[list[tuple]] = None
 
         self.__cfg = cfg
+        launcher.terminal = self.__cfg.get_terminal()
         self.__db_finder = DBExecutableFinder(self.__cfg)
         self.__fs_finder = FSExecutableFinder(self.__cfg)
         self.__executor = ThreadPoolExecutor(max_workers=1)
         self.__future = self.__executor.submit(self._init)
+        # queued right behind the walk on the same worker, without holding up the catalogue itself
+        self.__executor.submit(self._resolve_icons)
+        # the latest walk after the first, by a reload or a compaction; either one frees the removed rows
+        self.__compaction: Optional[Future] = None
+
+    @traced("engine.init")
+    def _init(self, rescan: bool = False):
+        with self.__lock:
+            self.__pending = []
+        try:
+            # every full walk starts a fresh catalogue, which drops the rows of applications removed in the meantime
+            catalogue = Catalogue()
+            # usage statistics are attached to the walked applications, rather than materialising them a second time
+            executables = self.__db_finder.merge(self.__fs_finder.walk(catalogue, rescan), catalogue)
+            desktop_entries.dump()
+
+            name_index = SearchIndex((app.get_name(), app) for app in executables.values())
+            path_index = SearchIndex((app.get_full_path(), app) for app in executables.values())
+            xdg_execs = Counter(app.get_full_path() for app in executables.values()
+                                if isinstance(app, XDGDesktopApplication))
+            frecency = FrecencyIndex((path, app.opened_count, app.last_opened_utc)
+                                     for path, app in executables.items())
+        except BaseException:
+            with self.__lock:
+                self.__pending = None
+            raise
 
-    @timeit
-    def _init(self):
-        fs_executables = self.__fs_finder.walk()
-        db_executables = self.__db_finder.walk()
-        self.__executables = fs_executables | db_executables
+        with self.__lock:
+            pending, self.__pending = self.__pending, None
+            self.__catalogue = catalogue
+            self.__executables = executables
+            self.__name_index = name_index
+            self.__path_index = path_index
+            self.__xdg_execs = xdg_execs
+            self.__frecency = frecency
+            # the events were applied to the previous catalogue only; applying them again is harmless
+            for event in pending:
+                if len(event) == 1:
+                    self._apply_directory_event(*event)
+                else:
+                    self._apply_file_event(*event)
 
-        # TODO implement the fuzzy search
-        #  do approximate string matching based on bitap algorithm
-        #  https://www.baeldung.com/cs/fuzzy-search-algorithm
+    @traced("engine.resolve_icons")
+    def _resolve_icons(self):
+        theme = self.__cfg.get_gtk().get("icontheme")
+        icon_index.refresh([theme] if theme else [])
+        with self.__lock:
+            icons = {app.get_icon() for app in self.__executables.values()}
+        icon_index.resolve_all(icons)
 
-    def get_executables(self):
+    def get_ready(self) -> Future:
+        """The first walk; once it's done, nothing waits for the catalogue anymore."""
+        return self.__future
+
+    def get_executables(self) -> dict[str, Application]:
+        """A copy of the catalogue, by path; the watcher keeps updating the engine's own in the meantime."""
+        self.__future.result()
+        with self.__lock:
+            return dict(self.__executables)
+
+    def get_executable(self, path: str) -> Optional[Application]:
         self.__future.result()
-        return self.__executables
+        with self.__lock:
+            return self.__executables.get(path)
 
-    # TODO implement
     def get_best_name_matches(self, partial_name, count) -> list[Application]:
         self.__future.result()
-        pass
+        return self.__name_index.search(partial_name, count)
 
-    # TODO implement
     def get_best_path_matches(self, partial_path, count) -> list[Application]:
         self.__future.result()
-        pass
+        return self.__path_index.search(partial_path, count)
+
+    def create_name_search_session(self) -> SearchSession:
+        """Session for incremental (keystroke-by-keystroke) name queries; survives reloads."""
+        return SearchSession(self._get_name_index)
+
+    def create_path_search_session(self) -> SearchSession:
+        """Session for incremental (keystroke-by-keystroke) path queries; survives reloads."""
+        return SearchSession(self._get_path_index)
+
+    def _get_name_index(self) -> SearchIndex:
+        self.__future.result()
+        return self.__name_index
+
+    def _get_path_index(self) -> SearchIndex:
+        self.__future.result()
+        return self.__path_index
 
     def get_most_recent_applications(self, count) -> list[Application]:
         self.__future.result()
-        apps: list[Application] = []
+        with self.__lock:
+            # the catalogue is kept fresh by the watcher, so availability doesn't need to touch the disk
+            return [self.__executables[path] for path in self.__frecency.top(count, self.__executables.__contains__)]
+
+    @traced("engine.launch")
+    def launch(self, app: Application, args: list[str] = ()) -> int:
+        """Launch app, accounting the launch & tracking its process tree; returns the pid."""
+        timestamp = time.time()
+        # tracked before the launcher's reaper can reap it, so that a short-lived launcher's pid is never mistaken
+        #  for whatever unrelated process gets it next
+        pid = app.run(args, functools.partial(sampler.track, path=self._get_usage_path(app), time_started=timestamp))
+        self.record_launch(app, timestamp)
+        return pid
 
-        for app in self.__db_finder.walk_by_frequency(count):
-            apps.append(self.__executables[app])
+    def record_launch(self, app: Application, timestamp: float = None):
+        """Account a launch of app in its usage statistics & the frecency ranking."""
+        self.__future.result()
+        timestamp = time.time() if timestamp is None else timestamp
+        path = self._get_usage_path(app)
+        with self.__lock:
+            app.update_opened_count_meta(app.opened_count + 1).update_last_opened_utc_meta(timestamp)
+            if app.first_opened_utc is None:
+                app.update_first_opened_utc_meta(timestamp)
+            self.__frecency.record_launch(path, timestamp)
+        db.writer.put(db.LaunchEvent(path, timestamp))
 
-        return apps
+    @staticmethod
+    def _get_usage_path(app: Application) -> str:
+        # usage is accounted per desktop entry, rather than per (possibly shared) binary
+        return app.get_full_path_dfp() if isinstance(app, XDGDesktopApplication) else app.get_full_path()
 
-    def reload(self):
+    def apply_file_event(self, directory: str, fname: str, present: bool):
+        """Incrementally apply a single file creation, modification or removal to the catalogue."""
         self.__future.result()
+        with self.__lock:
+            if self.__pending is not None:
+                self.__pending.append((directory, fname, present))
+            self._apply_file_event(directory, fname, present)
+            self._compact()
 
-        self.__future = self.__executor.submit(self._init)
+    def apply_directory_event(self, directory: str):
+        """Resynchronise everything under a directory that appeared, or disappeared, as a whole."""
+        self.__future.result()
+        with self.__lock:
+            if self.__pending is not None:
+                self.__pending.append((directory,))
+            self._apply_directory_event(directory)
+            self._compact()
+
+    def _apply_directory_event(self, directory: str):
+        prefix = directory + os.sep
+        for path in [p for p in self.__executables if p.startswith(prefix)]:
+            self._apply_file_event(os.path.dirname(path), os.path.basename(path), present=False)
+
+        for current_path, _, files in os.walk(directory):
+            for file in files:
+                self._apply_file_event(current_path, file, present=True)
+
+    def _compact(self):
+        # every update appends a row to the catalogue, while the rows of removed applications are only ever freed
+        #  along with the whole catalogue; readers keep the current one until the walk swaps in its replacement
+        if self.__compaction is not None and not self.__compaction.done():
+            return
+        if len(self.__catalogue) - len(self.__executables) > max(1024, len(self.__executables) * COMPACTION_RATIO):
+            logger.debug(f"compacting {self.__catalogue} of {len(self.__executables)} applications")
+            self.__compaction = self.__executor.submit(self._init)
+
+    def _apply_file_event(self, directory: str, fname: str, present: bool):
+        ef = ExecutableFile(directory, fname)
+        path = ef.get_path()
+        if fname.endswith(".desktop"):
+            old = self._remove(path)
+            app = Converter.convert_dotdesktop_to_application(path, self.__catalogue) \
+                if present and os.path.isfile(path) else None
+            if app:
+                if old:
+                    app.update_opened_count_meta(old.opened_count) \
+                        .update_last_opened_utc_meta(old.last_opened_utc) \
+                        .update_first_opened_utc_meta(old.first_opened_utc)
+                self._add(path, app)
+                self._hide_shadowed_binaries(app)
+            if old:
+                self._revive_shadowed_binaries(old)
+            return
+
+        valid = present and os.path.isfile(path) and os.access(path, os.X_OK) and not self._is_shadowed(ef)
+        if valid and path in self.__executables:
+            return
+        old = self._remove(path)
+        if valid:
+            self._add(path, Converter.convert_executable_to_application(ef, self.__catalogue))
+            if old:
+                self.__executables[path].update_opened_count_meta(old.opened_count) \
+                    .update_last_opened_utc_meta(old.last_opened_utc) \
+                    .update_first_opened_utc_meta(old.first_opened_utc)
+
+    def _add(self, path: str, app: Application):
+        self.__executables[path] = app
+        icon_index.resolve(app.get_icon())
+        self.__name_index.add(app.get_name(), app)
+        self.__path_index.add(app.get_full_path(), app)
+        if isinstance(app, XDGDesktopApplication):
+            self.__xdg_execs[app.get_full_path()] += 1
+
+    def _remove(self, path: str) -> Optional[Application]:
+        if (app := self.__executables.pop(path, None)) is None:
+            return None
+        self.__name_index.remove(app)
+        self.__path_index.remove(app)
+        if isinstance(app, XDGDesktopApplication):
+            self.__xdg_execs[app.get_full_path()] -= 1
+            if self.__xdg_execs[app.get_full_path()] <= 0:
+                del self.__xdg_execs[app.get_full_path()]
+        return app
+
+    def _is_shadowed(self, ef: ExecutableFile) -> bool:
+        # same matching rules as FSExecutableFinder._filter_xdg_from_binary_entries
+        return ef.fname in self.__xdg_execs and ef.is_bin_in_path() or ef.get_path() in self.__xdg_execs
+
+    def _hide_shadowed_binaries(self, xdg: XDGDesktopApplication):
+        target = xdg.get_full_path()
+        for path in [p for p, app in self.__executables.items() if isinstance(app, PlainApplication)]:
+            ef = ExecutableFile(os.path.dirname(path), os.path.basename(path))
+            if ef.fname == target and ef.is_bin_in_path() or path == target:
+                self._remove(path)
+
+    def _revive_shadowed_binaries(self, xdg: XDGDesktopApplication):
+        target = xdg.get_full_path()
+        if target in self.__xdg_execs:
+            return
+
+        if os.sep in target:
+            directory = os.path.dirname(target)
+            candidates = [(directory, os.path.basename(target))] if directory in self.__cfg.get_paths() else []
+        else:
+            candidates = [(d, target) for d in self.__cfg.get_paths() if d in Global.PATH_VALUES]
+        for directory, fname in candidates:
+            if os.path.isfile(os.path.join(directory, fname)):
+                self._apply_file_event(directory, fname, present=True)
+
+    def reload(self) -> Future:
+        """
+        Walk everything again on the engine's worker, without waiting for it: readers keep the current catalogue
+         until the walk swaps in its replacement. The returned future is done once it has.
+        Every directory is listed again, rather than trusting the snapshot, which can't tell about changed modes.
+        """
+        future = self.__compaction = self.__executor.submit(self._init, rescan=True)
+        self.__executor.submit(self._resolve_icons)
+        return future
@@ -0,0 +1,57 @@
+"""
+gRunner's frecency ranking.
+Every launch contributes a weight that halves every HALF_LIFE seconds; an application's frecency is the sum of
+ its launches' weights. Since every weight decays at the same rate, the ranking never changes just because time
+ passes, so it's kept sorted & only touched on launches; the scores are stored in log-space, relative to EPOCH.
+"""
+
+import math
+from bisect import bisect_left, insort
+from typing import Callable, Iterable, Optional
+
+from globals import autostr
+
+HALF_LIFE = 7 * 24 * 60 * 60
+EPOCH = 1_600_000_000
+_DECAY = math.log(2) / HALF_LIFE
+
+
+def _logaddexp(a: float, b: float) -> float:
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+@autostr
+class FrecencyIndex:
+    def __init__(self, usage: Iterable[tuple[str, int, Optional[float]]]):
+        """
+        :param usage: (path, opened_count, last_opened_utc) of every known application
+        """
+        self.scores: dict[str, float] = {}
+        for path, opened_count, last_opened in usage:
+            if opened_count > 0:
+                # the individual launch times aren't stored, so all of them are assumed to be the most recent one
+                self.scores[path] = math.log(opened_count) + _DECAY * ((last_opened or EPOCH) - EPOCH)
+        # (-score, path), so that the best applications come first
+        self.ranking: list[tuple[float, str]] = sorted((-score, path) for path, score in self.scores.items())
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def record_launch(self, path: str, timestamp: float):
+        weight = _DECAY * (timestamp - EPOCH)
+        if (old := self.scores.get(path)) is not None:
+            del self.ranking[bisect_left(self.ranking, (-old, path))]
+            weight = _logaddexp(old, weight)
+        self.scores[path] = weight
+        insort(self.ranking, (-weight, path))
+
+    def top(self, count: int, available: Callable[[str], bool] = lambda _: True) -> list[str]:
+        """Paths of the count most frecent applications, skipping those that aren't available."""
+        paths: list[str] = []
+        for _, path in self.ranking:
+            if len(paths) == count:
+                break
+            if available(path):
+                paths.append(path)
+        return paths
@@ -0,0 +1,210 @@
+"""
+gRunner's icon theme index.
+Resolves desktop entry Icon= values (theme icon names or absolute paths) to image files without GTK, following the
+ icon theme spec's lookup directories:
+    https://specifications.freedesktop.org/icon-theme-spec/icon-theme-spec-latest.html
+Every theme directory's listing is kept on disk keyed by its mtime, so a refresh only rescans directories that
+ changed; resolution runs on the engine's worker, and the UI only ever does a non-blocking dictionary lookup.
+"""
+
+import os
+import pickle
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from globals import Global
+
+ICON_EXTENSIONS = (".svg", ".png", ".xpm")
+# "scalable" directories win over any fixed size
+SCALABLE = 1 << 16
+_SIZE = re.compile(r"^(\d+)x\d+")
+
+
+def get_icon_base_directories() -> list[str]:
+    data_home = os.getenv("XDG_DATA_HOME") or os.path.join(Path.home(), ".local", "share")
+    return [
+        os.path.join(Path.home(), ".icons"),
+        os.path.join(data_home, "icons"),
+        *[os.path.join(d, "icons") for d in Global.XDG_DATA_DIRS_VALUES],
+    ]
+
+
+def get_pixmap_directories() -> list[str]:
+    return list(dict.fromkeys([*[os.path.join(d, "pixmaps") for d in Global.XDG_DATA_DIRS_VALUES],
+                               "/usr/share/pixmaps"]))
+
+
+def _directory_size(directory: str) -> int:
+    size = 0
+    for part in directory.split(os.sep):
+        if part == "scalable":
+            return SCALABLE
+        if m := _SIZE.match(part):
+            size = max(size, int(m.group(1)))
+    return size
+
+
+class IconIndex:
+    # bump whenever the pickled layout changes; stale caches are simply discarded
+    VERSION = 1
+
+    def __init__(self, path: Path = Global.ICON_CACHE):
+        self.path = path
+        self.themes: tuple[str, ...] = ()
+        # directory -> (mtime_ns, icon files, subdirectories)
+        self.listings: dict[str, tuple[int, list[str], list[str]]] = {}
+        # icon name -> best file, across every theme
+        self.names: dict[str, str] = {}
+        # Icon= value -> file (or None, if it can't be resolved); read by the UI without locking
+        self.resolved: dict[str, Optional[str]] = {}
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with self.path.open(mode="rb") as f:
+                version, themes, listings, names = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"couldn't load icon cache {self.path}, got exception {e}")
+            return
+
+        if version == IconIndex.VERSION:
+            self.themes, self.listings, self.names = themes, listings, names
+
+    def _dump(self):
+        # write & rename, so a crash mid-dump never leaves a truncated cache behind
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with tmp.open(mode="wb") as f:
+                pickle.dump((IconIndex.VERSION, self.themes, self.listings, self.names), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"couldn't write icon cache {self.path}, got exception {e}")
+
+    def _list(self, directory: str, listings: dict[str, tuple[int, list[str], list[str]]],
+              visited: set[tuple[int, int]]) -> bool:
+        """List directory & everything under it into listings, reusing unchanged listings; True if any changed."""
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return directory in self.listings
+        # themes symlink directories into one another (& ~/.icons is often a link to ~/.local/share/icons): every
+        #  directory is listed once, under the first path it's reached through, & symlink loops end here
+        if (st.st_dev, st.st_ino) in visited:
+            return False
+        visited.add((st.st_dev, st.st_ino))
+        mtime_ns = st.st_mtime_ns
+
+        changed = False
+        if (cached := self.listings.get(directory)) is not None and cached[0] == mtime_ns:
+            listing = cached
+        else:
+            changed = True
+            files: list[str] = []
+            subdirectories: list[str] = []
+            try:
+                with os.scandir(directory) as entries:
+                    for e in entries:
+                        if e.is_dir():
+                            subdirectories.append(e.path)
+                        elif e.name.endswith(ICON_EXTENSIONS):
+                            files.append(e.name)
+            except OSError:
+                pass
+            listing = (mtime_ns, files, subdirectories)
+
+        listings[directory] = listing
+        for subdirectory in listing[2]:
+            changed |= self._list(subdirectory, listings, visited)
+        return changed
+
+    def _rank(self, theme: str) -> int:
+        if theme in self.themes:
+            return self.themes.index(theme)
+        # the spec's fallback theme comes right after the preferred ones, any other theme after that
+        return len(self.themes) + (0 if theme == "hicolor" else 1)
+
+    def _build_names(self, roots: dict[str, int]) -> dict[str, str]:
+        """Best file of every icon name, given the rank of every root (theme or pixmap) directory."""
+        best: dict[str, tuple[tuple[int, int, int], str]] = {}
+        for directory, (_, files, _) in self.listings.items():
+            if not files:
+                continue
+            if (rank := next((rk for r, rk in roots.items() if directory == r or directory.startswith(r + os.sep)),
+                             None)) is None:
+                continue
+            size = _directory_size(directory)
+            for fname in files:
+                name, ext = os.path.splitext(fname)
+                key = (rank, -size, ICON_EXTENSIONS.index(ext))
+                if (current := best.get(name)) is None or key < current[0]:
+                    best[name] = (key, os.path.join(directory, fname))
+        return {name: path for name, (_, path) in best.items()}
+
+    def refresh(self, themes: Iterable[str] = ()):
+        """(Re)index every icon theme, rescanning only the directories that changed since the last refresh."""
+        with self.lock:
+            if not self.listings:
+                self._load()
+
+            themes = tuple(themes)
+            changed = themes != self.themes
+            self.themes = themes
+
+            listings: dict[str, tuple[int, list[str], list[str]]] = {}
+            visited: set[tuple[int, int]] = set()
+            roots: dict[str, int] = {}
+            for base in get_icon_base_directories():
+                changed |= self._list(base, listings, visited)
+                if base in listings:
+                    for theme_directory in listings[base][2]:
+                        roots.setdefault(theme_directory, self._rank(os.path.basename(theme_directory)))
+            for pixmaps in get_pixmap_directories():
+                changed |= self._list(pixmaps, listings, visited)
+                # below every theme
+                roots.setdefault(pixmaps, len(themes) + 2)
+
+            changed |= listings.keys() != self.listings.keys()
+            self.listings = listings
+            if not changed:
+                return
+
+            self.names = self._build_names(roots)
+            self.resolved = {}
+            self._dump()
+
+    def resolve(self, icon: Optional[str]) -> Optional[str]:
+        """File of icon, if any, remembering the answer for lookup(); called by both the engine & the watcher."""
+        if not icon:
+            return None
+        with self.lock:
+            if (path := self.resolved.get(icon)) is not None or icon in self.resolved:
+                return path
+
+            path = None
+            if os.path.isabs(icon):
+                path = icon if os.path.isfile(icon) else None
+            else:
+                name = icon[:-4] if icon.endswith(ICON_EXTENSIONS) else icon
+                while name and (path := self.names.get(name)) is None:
+                    # the spec's fallback: "a-b-c" is looked up as "a-b", then "a"
+                    name = name.rpartition("-")[0]
+            self.resolved[icon] = path
+            return path
+
+    def resolve_all(self, icons: Iterable[Optional[str]]):
+        for icon in icons:
+            self.resolve(icon)
+
+    def lookup(self, icon: Optional[str]) -> Optional[str]:
+        """File of icon if it was already resolved, without ever touching the disk; safe to call from the UI."""
+        return self.resolved.get(icon) if icon else None
+
+
+# the process-wide index; refreshed & resolved by the engine's worker
+icon_index = IconIndex()
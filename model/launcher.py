@@ -0,0 +1,234 @@
+"""
+gRunner's process launcher.
+Processes are started with posix_spawn(3), which glibc implements with vfork semantics (CLONE_VM | CLONE_VFORK), so
+ launching never copies the background process' heap; children get /dev/null as their standard streams, their own
+ session, and nothing else (every other fd is close-on-exec). Children are reaped by a dedicated thread that waits
+ on pidfds, so a launch never blocks the caller.
+Terminal=true entries run inside the configured terminal emulator, since their standard streams would be /dev/null
+ otherwise. posix_spawn(3) has no portable way to change directories, so entries with a Path= go through a shell
+ that cd's into it & execs the entry in place, which keeps the pid the same.
+Desktop entry Exec= values are tokenised & stripped of their entry-specific field codes once per entry:
+    https://specifications.freedesktop.org/desktop-entry-spec/latest/exec-variables.html
+"""
+
+import functools
+import os
+import select
+import threading
+from typing import Callable, Optional, Sequence, Union
+
+from loguru import logger
+
+from globals import autostr
+
+
+class FieldCode(str):
+    """A %f/%F/%u/%U placeholder, which is only known at launch time."""
+
+
+SINGLE_FILE = FieldCode("%f")
+FILES = FieldCode("%F")
+SINGLE_URL = FieldCode("%u")
+URLS = FieldCode("%U")
+_FIELD_CODES = {c: c for c in (SINGLE_FILE, FILES, SINGLE_URL, URLS)}
+_DEPRECATED_FIELD_CODES = {"%d", "%D", "%n", "%N", "%v", "%m"}
+# reserved characters that force an argument to be quoted; inside quotes, these are backslash-escaped
+_ESCAPABLE = '"`$\\'
+
+ExecTemplate = tuple[Union[str, FieldCode], ...]
+
+# $0 is the working directory, "$@" the command line; exec keeps the pid, which on_spawned may be tracking
+_CHDIR_TRAMPOLINE = ("/bin/sh", "-c", 'cd -- "$0" && exec "$@"')
+
+
+def split_exec(exec_: str) -> list[str]:
+    """Tokenise an Exec= value, honouring the spec's double quoting rules."""
+    tokens: list[str] = []
+    buf: list[str] = []
+    in_token = quoted = False
+    i = 0
+    while i < len(exec_):
+        c = exec_[i]
+        if quoted:
+            if c == "\\" and i + 1 < len(exec_) and exec_[i + 1] in _ESCAPABLE:
+                i += 1
+                buf.append(exec_[i])
+            elif c == '"':
+                quoted = False
+            else:
+                buf.append(c)
+        elif c == '"':
+            quoted = in_token = True
+        elif c in " \t\n":
+            if in_token:
+                tokens.append("".join(buf))
+                buf.clear()
+                in_token = False
+        else:
+            buf.append(c)
+            in_token = True
+        i += 1
+    if in_token:
+        tokens.append("".join(buf))
+    return tokens
+
+
+def _expand_token(token: str, name: str, dfp: str) -> str:
+    out: list[str] = []
+    i = 0
+    while i < len(token):
+        if token[i] == "%" and i + 1 < len(token):
+            code = token[i + 1]
+            if code == "%":
+                out.append("%")
+            elif code == "c":
+                out.append(name)
+            elif code == "k":
+                out.append(dfp)
+            # anything else is deprecated (%d %D %n %N %v %m) or invalid inside an argument: dropped
+            i += 2
+            continue
+        out.append(token[i])
+        i += 1
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_exec(exec_: str, name: str, icon: Optional[str], dfp: str) -> ExecTemplate:
+    """Exec= of a desktop entry with every field code but the file/url ones expanded; cached per entry."""
+    template: list[Union[str, FieldCode]] = []
+    for token in split_exec(exec_):
+        if (code := _FIELD_CODES.get(token)) is not None:
+            template.append(code)
+        elif token == "%i":
+            if icon:
+                template += ["--icon", icon]
+        elif token in _DEPRECATED_FIELD_CODES:
+            continue
+        else:
+            template.append(_expand_token(token, name, dfp))
+    return tuple(template)
+
+
+def expand_exec(template: ExecTemplate, args: Sequence[str] = ()) -> list[str]:
+    """Final argv of a compiled Exec=, substituting args for its file/url field code."""
+    argv: list[str] = []
+    for token in template:
+        if token is SINGLE_FILE or token is SINGLE_URL:
+            argv += args[:1]
+        elif token is FILES or token is URLS:
+            argv += args
+        else:
+            argv.append(token)
+    return argv
+
+
+@autostr
+class ChildReaper:
+    """Reaps launched children from a single thread, waiting on their pidfds."""
+
+    def __init__(self):
+        self.children: dict[int, int] = {}
+        # pidfds handed over by watch(), registered by the reaper thread itself
+        self.pending: list[int] = []
+        self.lock = threading.Lock()
+        self.wakeup_r, self.wakeup_w = os.pipe2(os.O_CLOEXEC | os.O_NONBLOCK)
+        self.thread: Optional[threading.Thread] = None
+
+    def watch(self, pid: int):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError) as e:
+            # no pidfds (python < 3.9 or linux < 5.3); fall back to a waiter thread for this one child
+            logger.debug(f"couldn't open pidfd of {pid}, got exception {e}")
+            threading.Thread(target=self._wait, args=(pid,), name=f"reaper-{pid}", daemon=True).start()
+            return
+
+        with self.lock:
+            self.children[pidfd] = pid
+            self.pending.append(pidfd)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="child-reaper", daemon=True)
+                self.thread.start()
+        try:
+            os.write(self.wakeup_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def _wait(pid: int):
+        try:
+            _, status = os.waitpid(pid, 0)
+        except ChildProcessError:
+            return
+        logger.debug(f"child {pid} exited with {os.waitstatus_to_exitcode(status)}")
+
+    def _loop(self):
+        poll = select.poll()
+        poll.register(self.wakeup_r, select.POLLIN)
+        while True:
+            with self.lock:
+                for pidfd in self.pending:
+                    poll.register(pidfd, select.POLLIN)
+                self.pending.clear()
+
+            for fd, _ in poll.poll():
+                if fd == self.wakeup_r:
+                    try:
+                        while os.read(self.wakeup_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                poll.unregister(fd)
+                with self.lock:
+                    pid = self.children.pop(fd)
+                os.close(fd)
+                self._wait(pid)
+
+
+@autostr
+class Launcher:
+    def __init__(self):
+        self.reaper = ChildReaper()
+        # the configured terminal emulator's command line, set by the engine
+        self.terminal: list[str] = ["xdg-terminal-exec"]
+
+    def spawn(self, argv: list[str], on_spawned: Optional[Callable[[int], None]] = None,
+              cwd: Optional[str] = None, terminal: bool = False) -> int:
+        """
+        Start argv detached from gRunner & return its pid; raises OSError if it can't be started.
+        on_spawned gets the pid before the reaper does: up to then, the child can't be reaped (& its pid reused), even
+         if it has already exited.
+        cwd is the directory to start in, & terminal wraps argv in the terminal emulator.
+        """
+        if not argv:
+            raise ValueError("nothing to launch")
+        if terminal:
+            argv = [*self.terminal, *argv]
+        if cwd is not None:
+            # checked here, since the trampoline would only fail inside the detached child, where nobody sees it
+            if not os.path.isdir(cwd):
+                raise NotADirectoryError(f"working directory {cwd} of {argv} doesn't exist")
+            argv = [*_CHDIR_TRAMPOLINE, cwd, *argv]
+        pid = os.posix_spawnp(
+            argv[0], argv, os.environ,
+            file_actions=[
+                (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+            ],
+            setsid=True,
+        )
+        try:
+            if on_spawned is not None:
+                on_spawned(pid)
+        finally:
+            self.reaper.watch(pid)
+        logger.debug(f"launched {argv} as {pid}")
+        return pid
+
+
+# the process-wide launcher
+launcher = Launcher()
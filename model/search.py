@@ -0,0 +1,248 @@
+"""
+gRunner's fuzzy search module.
+Bounded-error bitap (Wu-Manber shift-and), run over every key of the catalogue at once: rather than the bits of a
+ machine word standing for positions of the query, as in textbook bitap, every key gets a bit lane of its own in
+ arbitrarily long ints, so that a handful of big int operations per key position steps the automaton of all keys:
+    https://www.baeldung.com/cs/fuzzy-search-algorithm
+The automaton reads the query rather than the keys, so its state only depends on the query's prefix read so far.
+"""
+
+import heapq
+import itertools
+import operator
+import os
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from globals import autostr
+from tracing import traced
+
+# edits tolerated by the longest queries
+MAX_ERRORS = 2
+# dead lanes tolerated, as a share of the live ones, before the index is rebuilt from its live keys
+COMPACTION_RATIO = .25
+
+# state[d][j + 1] has the lanes of the keys with a match of the query read so far, with at most d errors, that
+#  ends at key position j; state[d][0] stands for the position before the first
+State = list[list[int]]
+
+
+def max_errors_for(query: str) -> int:
+    """Amount of edits tolerated for a query; short queries must match (almost) exactly."""
+    return min(MAX_ERRORS, len(query) // 4)
+
+
+def _lower(key: str) -> str:
+    # share the catalogue's string whenever it already is lowercase
+    return lowered if (lowered := key.lower()) != key else key
+
+
+def _bitsets(column: str) -> dict[str, int]:
+    """Every character of column -> the lanes it's at; lane i is column[i]."""
+    column = column[::-1]
+    distinct = set(column)
+    if len(distinct) > 256:
+        return {c: int("".join("1" if x == c else "0" for x in column), 2) for c in distinct}
+
+    # a byte per character, translated into a string of binary digits per distinct character; all of it in C
+    codes = {c: i for i, c in enumerate(distinct)}
+    encoded = column.translate({ord(c): i for c, i in codes.items()}).encode("latin-1")
+    return {c: int(encoded.translate(b"0" * i + b"1" + b"0" * (255 - i)), 2) for c, i in codes.items()}
+
+
+def _descending(lanes: int) -> Iterator[int]:
+    """Every lane of lanes, highest first."""
+    digits = bin(lanes)
+    top = len(digits) - 3
+    i = digits.find("1", 2)
+    while i >= 0:
+        yield top - i + 2
+        i = digits.find("1", i + 1)
+
+
+@autostr
+class SearchIndex:
+    """Bit-parallel bitap index over the (lowercased) keys of a catalogue."""
+
+    def __init__(self, entries: Iterable[tuple[str, object]]):
+        # bumped on every in-place update, so that sessions know their cached state is stale
+        self.generation = 0
+        self.lock = threading.RLock()
+        self._build(entries)
+
+    def _build(self, entries: Iterable[tuple[str, object]]):
+        # longest keys first, ties by key in reverse: the keys long enough to have a position j are then always the
+        #  lowest lanes, which keeps the ints of later positions short, & lanes read highest first are in
+        #  (length, key) order, which is how matches that are otherwise equal are ranked
+        pairs = sorted(((_lower(key), value) for key, value in entries), key=lambda e: (len(e[0]), e[0]),
+                       reverse=True)
+        self.keys: list[str] = [key for key, _ in pairs]
+        self.values: list[object] = [value for _, value in pairs]
+        self.ids: dict[object, int] = {value: i for i, value in enumerate(self.values)}
+        # lanes past these were added in place, in no particular order
+        self.sorted = len(self.keys)
+        self.sorted_mask = (1 << self.sorted) - 1
+        self.live = self.sorted_mask
+        # position -> character -> lanes with that character at that position
+        self.positions: list[dict[str, int]] = []
+        # position -> live lanes with a key long enough to have that position
+        self.masks: list[int] = []
+        for column in itertools.zip_longest(*self.keys, fillvalue=""):
+            column = "".join(column)
+            self.positions.append(_bitsets(column))
+            self.masks.append((1 << len(column)) - 1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, key: str, value: object):
+        with self.lock:
+            self.remove(value)
+            lane = len(self.keys)
+            key = _lower(key)
+            self.keys.append(key)
+            self.values.append(value)
+            self.ids[value] = lane
+            bit = 1 << lane
+            for j, c in enumerate(key):
+                if j == len(self.positions):
+                    self.positions.append({})
+                    self.masks.append(0)
+                self.positions[j][c] = self.positions[j].get(c, 0) | bit
+                self.masks[j] |= bit
+            self.live |= bit
+            self.generation += 1
+            self._compact()
+
+    def remove(self, value: object):
+        with self.lock:
+            if (lane := self.ids.pop(value, None)) is None:
+                return
+            # the lane is left in positions, but it's out of live & the masks, so no state ever has it again
+            cleared = ~(1 << lane)
+            for j in range(len(self.keys[lane])):
+                self.masks[j] &= cleared
+            self.live &= cleared
+            self.values[lane] = None
+            self.generation += 1
+            self._compact()
+
+    def _compact(self):
+        # every update leaves a dead lane behind (a modified entry is removed, then added again), which every search
+        #  still pays for; the rebuild renumbers the lanes, which the update's generation already told sessions about
+        if len(self.keys) - len(self.ids) > max(64, len(self.ids) * COMPACTION_RATIO):
+            self._build([(self.keys[lane], value) for value, lane in self.ids.items()])
+
+    def start(self, errors: int) -> State:
+        """State of the empty query: it matches every live key, anywhere, with up to errors errors."""
+        return [[self.live, *self.masks]] * (errors + 1)
+
+    @traced("search.scan")
+    def extend(self, state: State, c: str) -> State:
+        """State after reading c, given the state of the query before it; tolerates as many errors as state does."""
+        eq = [position.get(c, 0) for position in self.positions]
+        masks = self.masks
+        # exactly: the query matched up to the previous position, & c matches this one
+        row = [0, *map(operator.and_, state[0], eq)]
+        extended = [row]
+        for d in range(1, len(state)):
+            # with d errors: as above, or with d - 1 errors & c substituted for, inserted or deleted
+            same, fewer = state[d], state[d - 1]
+            row = [fewer[0]]
+            row += [(p & e) | ((substituted | inserted | deleted) & mask)
+                    for p, e, substituted, inserted, deleted, mask
+                    in zip(same, eq, fewer, extended[d - 1], fewer[1:], masks)]
+            extended.append(row)
+        return extended
+
+    def _ordered(self, lanes: int) -> Iterator[int]:
+        """Every lane of lanes, by (key length, key)."""
+        ordered = _descending(lanes & self.sorted_mask)
+        if not (added := lanes >> self.sorted):
+            return ordered
+        added_lanes = sorted((self.sorted + i for i in _descending(added)),
+                             key=lambda lane: (len(self.keys[lane]), self.keys[lane]))
+        return heapq.merge(ordered, added_lanes, key=lambda lane: (len(self.keys[lane]), self.keys[lane]))
+
+    @traced("search.rank")
+    def rank(self, state: State, query: str, count: int) -> list[object]:
+        """
+        Values of the best count matches in the state of query: fewest errors first, then the leftmost match, then the
+         shortest key, then the key itself.
+        """
+        results: list[object] = []
+        ranked = 0
+        for row in state[:max_errors_for(query) + 1]:
+            # the lanes first matched with this many errors, by the start of their leftmost match
+            found = ranked
+            starts: dict[int, int] = {}
+            for j in range(1, len(row)):
+                if lanes := row[j] & ~found:
+                    found |= lanes
+                    start = max(0, j - len(query))
+                    starts[start] = starts.get(start, 0) | lanes
+            ranked = found
+
+            for start in sorted(starts):
+                for lane in self._ordered(starts[start]):
+                    results.append(self.values[lane])
+                    if len(results) == count:
+                        return results
+        return results
+
+    @traced("search.index")
+    def search(self, query: str, count: int) -> list[object]:
+        query = query.lower()
+        if not query:
+            return []
+        with self.lock:
+            state = self.start(max_errors_for(query))
+            for c in query:
+                state = self.extend(state, c)
+            return self.rank(state, query, count)
+
+
+@autostr
+class SearchSession:
+    """
+    Keystroke-by-keystroke search against an index.
+    The index's state after every character of the query is kept, tolerating as many errors as the longest queries
+     do, so a query that extends the previous one only reads its new characters, & erasing characters pops back to
+     the state of the shorter query; a query with fewer tolerated errors simply ranks the first few rows.
+    """
+
+    def __init__(self, get_index: Callable[[], SearchIndex]):
+        self.get_index = get_index
+        self.index: Optional[SearchIndex] = None
+        self.generation = -1
+        # the query read so far, & the index's state after each of its characters
+        self.query = ""
+        self.states: list[State] = []
+
+    def reset(self):
+        self.query = ""
+        self.states.clear()
+
+    def read(self, index: SearchIndex, query: str) -> State:
+        """State of the index after query, reading only what the previous query doesn't share with it."""
+        shared = len(os.path.commonprefix((self.query, query)))
+        del self.states[shared:]
+        state = self.states[-1] if self.states else index.start(MAX_ERRORS)
+        for c in query[shared:]:
+            state = index.extend(state, c)
+            self.states.append(state)
+        self.query = query
+        return state
+
+    @traced("search.session")
+    def search(self, query: str, count: int) -> list[object]:
+        index = self.get_index()
+        with index.lock:
+            if index is not self.index or index.generation != self.generation:
+                self.index = index
+                self.generation = index.generation
+                self.reset()
+            if not (query := query.lower()):
+                self.reset()
+                return []
+            return index.rank(self.read(index, query), query, count)
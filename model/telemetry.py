@@ -0,0 +1,173 @@
+"""
+gRunner's process telemetry sampler.
+Tracks the process trees of launched applications, reading /proc/<pid>/statm & the children lists in one batched
+ pass per tick. The /proc files are opened once per process & re-read with pread(2), so that a tick costs a couple
+ of syscalls per process; ticks slow down while nothing changes & speed back up as soon as something does.
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+from . import db
+from globals import autostr
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class _ProcFiles:
+    __slots__ = ("statm", "children")
+
+    def __init__(self, pid: int):
+        self.statm = os.open(f"/proc/{pid}/statm", os.O_RDONLY | os.O_CLOEXEC)
+        # only the main thread's children; good enough for the vast majority of launchers
+        self.children: Optional[int] = None
+        try:
+            self.children = os.open(f"/proc/{pid}/task/{pid}/children", os.O_RDONLY | os.O_CLOEXEC)
+        except FileNotFoundError:
+            # statm is there, so the process is: the kernel just doesn't list children (no CONFIG_PROC_CHILDREN);
+            #  the process alone is sampled then
+            pass
+        except OSError:
+            os.close(self.statm)
+            raise
+
+    def close(self):
+        os.close(self.statm)
+        if self.children is not None:
+            os.close(self.children)
+
+
+@autostr
+class TrackedApplication:
+    def __init__(self, path: str, pid: int, time_started: float):
+        self.path = path
+        self.root = pid
+        self.time_started = time_started
+        self.files: dict[int, _ProcFiles] = {}
+        self.last_sample: Optional[tuple[int, int]] = None
+
+    def open_files(self, pid: int) -> Optional[_ProcFiles]:
+        if (files := self.files.get(pid)) is None:
+            try:
+                files = self.files[pid] = _ProcFiles(pid)
+            except OSError:
+                return None
+        return files
+
+    def sample(self) -> Optional[tuple[int, int]]:
+        """(total resident memory in bytes, process count) of the whole tree, or None once it's gone."""
+        memory = 0
+        alive: set[int] = set()
+        pending = [self.root]
+        while pending:
+            pid = pending.pop()
+            if pid in alive or (files := self.open_files(pid)) is None:
+                continue
+            try:
+                # statm: size resident shared text lib data dt (in pages)
+                memory += int(os.pread(files.statm, 128, 0).split()[1]) * _PAGE_SIZE
+                if files.children is not None:
+                    pending += map(int, os.pread(files.children, 4096, 0).split())
+            except OSError:
+                # exited; the fds stay bound to the dead process, even if its pid gets reused
+                continue
+            alive.add(pid)
+
+        for pid in self.files.keys() - alive:
+            self.files.pop(pid).close()
+        return (memory, len(alive)) if alive else None
+
+    def close(self):
+        for files in self.files.values():
+            files.close()
+        self.files.clear()
+
+
+class ProcessSampler:
+    def __init__(self, min_interval: float = 1., max_interval: float = 30., change_threshold: float = .05):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # relative change in memory that counts as "something happened"
+        self.change_threshold = change_threshold
+        self.interval = min_interval
+
+        self.tracked: dict[int, TrackedApplication] = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+
+    def track(self, pid: int, path: str, time_started: float = None):
+        time_started = time.time() if time_started is None else time_started
+        app = TrackedApplication(path, pid, time_started)
+        # right away, while pid is surely still the launched process (see Launcher.spawn): the fds stay bound to it,
+        #  so a tick can never sample whatever process gets the pid after it's reaped
+        app.open_files(pid)
+        with self.lock:
+            self.tracked[pid] = app
+        db.writer.put(db.UserSessionEvent(path, time_started))
+
+        # sample the newcomer soon, at the fast rate
+        self.interval = self.min_interval
+        self.wakeup.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="process-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join()
+        self.thread = None
+        with self.lock:
+            for app in self.tracked.values():
+                app.close()
+            self.tracked.clear()
+
+    def _loop(self):
+        while not self.stopping:
+            self.wakeup.wait(self.interval if self.tracked else None)
+            self.wakeup.clear()
+            if self.stopping:
+                return
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"process sampling failed, got exception {e}")
+
+    def sample(self):
+        """Sample every tracked tree once, emitting a heartbeat for each & closing the sessions that ended."""
+        now = time.time()
+        changed = False
+        with self.lock:
+            apps = list(self.tracked.values())
+
+        for app in apps:
+            if (sample := app.sample()) is None:
+                with self.lock:
+                    self.tracked.pop(app.root, None)
+                app.close()
+                db.writer.put(db.UserSessionEvent(app.path, app.time_started, now))
+                changed = True
+                continue
+
+            memory, count = sample
+            if app.last_sample is None or count != app.last_sample[1] \
+                    or abs(memory - app.last_sample[0]) > self.change_threshold * max(app.last_sample[0], 1):
+                changed = True
+            app.last_sample = sample
+            db.writer.put(db.HeartbeatEvent(app.path, app.time_started, now, memory, count))
+
+        # back off exponentially while every tree is steady
+        self.interval = self.min_interval if changed else min(self.interval * 2, self.max_interval)
+
+
+# the process-wide sampler; started by the background process
+sampler = ProcessSampler()
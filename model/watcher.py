@@ -0,0 +1,239 @@
+"""
+gRunner's live catalogue watcher.
+Watches every configured directory through inotify(7) (bound with ctypes, no extra dependencies), and forwards
+ file creations, removals & renames to the Engine, so the catalogue stays fresh without a full rescan.
+Configured directories that don't exist (yet, such as ~/.local/bin on a fresh install, or anymore, after they've been
+ removed or moved away) are waited for through a watch on their nearest existing ancestor, & picked up as soon as
+ they're created.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from typing import Optional
+
+from loguru import logger
+
+from .engine import Engine
+from globals import Configuration
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF \
+             | IN_MOVE_SELF | IN_ONLYDIR
+PRESENT_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+ABSENT_MASK = IN_MOVED_FROM | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT = struct.Struct("iIII")
+
+
+def _is_empty_file(path: str) -> bool:
+    try:
+        return not os.path.islink(path) and os.path.getsize(path) == 0
+    except OSError:
+        return False
+
+
+class Inotify:
+    """Minimal ctypes binding of the inotify(7) API."""
+
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+    def __init__(self):
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        if self._libc.inotify_rm_watch(self.fd, wd) < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+    def read(self) -> list[tuple[int, int, str]]:
+        """Every pending event, as (watch descriptor, mask, name)."""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events: list[tuple[int, int, str]] = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class CatalogueWatcher:
+    def __init__(self, cfg: Configuration, engine: Engine):
+        self.recursive: bool = cfg.get_recursive()
+        self.paths: list[str] = cfg.get_paths()
+        self.engine = engine
+
+        self.inotify: Optional[Inotify] = None
+        self.directories: dict[int, str] = {}
+        # configured directories that don't exist -> the watch of their nearest existing ancestor
+        self.missing: dict[str, int] = {}
+        self.thread: Optional[threading.Thread] = None
+        self.wakeup_r, self.wakeup_w = os.pipe()
+
+    def start(self):
+        try:
+            self.inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"inotify is unavailable, the catalogue will only refresh on reload: {e}")
+            return
+
+        for p in self.paths:
+            self._watch(p)
+
+        self.thread = threading.Thread(target=self._loop, name="catalogue-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        os.write(self.wakeup_w, b"\0")
+        self.thread.join()
+        self.inotify.close()
+        self.thread = None
+
+    def _watch(self, path: str):
+        if path in self.directories.values():
+            return
+        if not os.path.isdir(path):
+            if path in self.paths:
+                self._watch_ancestor(path)
+            return
+        try:
+            self.directories[self.inotify.add_watch(path, WATCH_MASK)] = path
+        except OSError as e:
+            logger.warning(f"couldn't watch {path}, got exception {e}")
+            return
+
+        if not self.recursive:
+            return
+        try:
+            with os.scandir(path) as entries:
+                subdirectories = [e.path for e in entries if e.is_dir() and not e.is_symlink()]
+        except OSError:
+            return
+        for subdirectory in subdirectories:
+            self._watch(subdirectory)
+
+    def _watch_ancestor(self, path: str):
+        ancestor = os.path.dirname(path)
+        while not os.path.isdir(ancestor):
+            if ancestor == (ancestor := os.path.dirname(ancestor)):
+                return
+        try:
+            # the same mask as any other watch, since an ancestor may well be a configured directory itself, & there's
+            #  only ever one watch (& mask) per directory
+            self.missing[path] = self.inotify.add_watch(ancestor, WATCH_MASK)
+        except OSError as e:
+            logger.warning(f"couldn't watch {ancestor} for {path} to be created, got exception {e}")
+            return
+        if os.path.isdir(path):
+            # created in between of looking for it & watching its ancestor
+            self._rewatch_missing(self.missing[path])
+
+    def _rewatch_missing(self, wd: int):
+        """Look again for the missing directories waited for through watch descriptor wd."""
+        for path in [p for p, w in self.missing.items() if w == wd]:
+            del self.missing[path]
+            # either watches it, or its nearest existing ancestor, which may be deeper than the previous one by now
+            self._watch(path)
+            if path not in self.directories.values():
+                continue
+            # anything created in it before the watch was in place has to be picked up by hand
+            if self.recursive:
+                self.engine.apply_directory_event(path)
+            else:
+                for name in os.listdir(path):
+                    self.engine.apply_file_event(path, name, present=True)
+
+    def _loop(self):
+        while True:
+            readable, _, _ = select.select([self.inotify.fd, self.wakeup_r], [], [])
+            if self.wakeup_r in readable:
+                return
+
+            for wd, mask, name in self.inotify.read():
+                try:
+                    self._handle(wd, mask, name)
+                except Exception as e:
+                    logger.warning(f"couldn't apply inotify event {name} ({mask:#x}), got exception {e}")
+
+    def _handle(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("inotify queue overflowed, reloading the whole catalogue")
+            self.engine.reload()
+            return
+
+        if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+            if (path := self.directories.pop(wd, None)) is not None:
+                if mask & IN_MOVE_SELF:
+                    # the watch follows the directory to wherever it was moved, which isn't configured
+                    try:
+                        self.inotify.rm_watch(wd)
+                    except OSError:
+                        pass
+                if path in self.paths:
+                    # whatever it had is gone with it (a move reports nothing about its files), & it's waited for
+                    #  until it's back, same as a configured directory that never existed
+                    self.engine.apply_directory_event(path)
+                    self._watch_ancestor(path)
+            # an ancestor that went away is waited for through its own ancestor
+            self._rewatch_missing(wd)
+            return
+
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            self._rewatch_missing(wd)
+
+        if (directory := self.directories.get(wd)) is None:
+            return
+
+        if mask & IN_ISDIR:
+            if self.recursive and mask & (PRESENT_MASK | ABSENT_MASK):
+                path = os.path.join(directory, name)
+                self._watch(path)
+                # anything created before the watch was in place has to be picked up by hand
+                self.engine.apply_directory_event(path)
+            return
+
+        if mask & IN_CREATE and _is_empty_file(os.path.join(directory, name)):
+            # still being written; IN_CLOSE_WRITE follows once it has any content worth parsing
+            return
+
+        if mask & PRESENT_MASK:
+            self.engine.apply_file_event(directory, name, present=True)
+        elif mask & ABSENT_MASK:
+            self.engine.apply_file_event(directory, name, present=False)
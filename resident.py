@@ -0,0 +1,106 @@
+"""
+gRunner's resident instance.
+Everything heavy (GTK, peewee & the whole model) is imported here, and only once an invocation finds no running
+ instance to summon; see main for the lightweight client path.
+"""
+
+import datetime
+import threading
+import time
+from pathlib import Path
+
+from ilock import ILock, ILockException
+from loguru import logger
+
+from ui.gtk import get_ui
+from model.api import HeadlessAPI
+from model.engine import Engine
+from model.telemetry import sampler
+from model.watcher import CatalogueWatcher
+from globals import Global, Configuration
+from ipc import SUMMON_TIMEOUT, Command, notify_running_process
+from ipc_server import IPCServer, cleanup
+
+
+class LogLevels:
+    TRACE = "TRACE"  # 5
+    DEBUG = "DEBUG"  # 10
+    INFO = "INFO"  # 20
+    SUCCESS = "SUCCESS"  # 25
+    WARNING = "WARNING"  # 30
+    ERROR = "ERROR"  # 40
+    CRITICAL = "CRITICAL"  # 50
+
+
+def run_ui(address, cfg, engine):
+    # the application & its window live as long as the process does; summons only re-present the window
+    gui = get_ui()
+    gui.load_model(cfg, engine)
+
+    action_map = {
+        Command.CLOSE: lambda _: gui.request_shutdown(),
+        Command.START_GUI: lambda _: gui.request_summon(),
+        **HeadlessAPI(engine).get_actions()
+    }
+    server = IPCServer(address, action_map)
+    try:
+        server.bind()
+    except OSError as e:
+        # nothing could ever summon this instance; an abstract address may also have been taken by another user
+        logger.critical(f"couldn't listen on {address!r}, got exception {e}")
+        return 1
+    threading.Thread(target=server.serve_forever, name="ipc", daemon=True).start()
+
+    return gui.run()
+
+
+def main(address):
+    try:
+        cfg = Configuration()
+    except Exception as e:
+        logger.critical(f"Tried to read {Global.CFG}, but got critical error {e}")
+        exit(1)
+
+    engine = Engine(cfg)
+    watcher = CatalogueWatcher(cfg, engine)
+    watcher.start()
+    sampler.start()
+
+    try:
+        return run_ui(address, cfg, engine)
+    finally:
+        sampler.stop()
+        watcher.stop()
+        cleanup(address)
+
+
+def start(address) -> int:
+    logger.add(
+        level=LogLevels.TRACE,
+        sink=Path(Global.LOGS, f"grunner-{datetime.datetime.utcnow()}.log"),
+        enqueue=True,
+        rotation="4 weeks",
+        encoding="utf-8",
+        backtrace=True,
+        diagnose=True,  # FIXME set false in production
+        catch=False
+    )
+    try:
+        with ILock(Global.APP_GUID, timeout=.005):
+            logger.trace("Got ILock!")
+            return main(address)
+    except ILockException:
+        logger.debug("Another instance of gRunner is starting up, notifying & exiting...")
+        # it holds the lock, but might not be listening just yet
+        for delay in (.05, .1, .2, .4, .8):
+            time.sleep(delay)
+            try:
+                notify_running_process(address, Command.START_GUI, timeout=SUMMON_TIMEOUT)
+                return 0
+            except OSError:
+                continue
+        logger.error("Another instance of gRunner holds the lock, but never started listening")
+        return 1
+    except FileNotFoundError as exc:
+        logger.critical(exc)
+        return 1
@@ -0,0 +1,20 @@
+"""
+gRunner's test configuration.
+globals reads $HOME, $PATH & $XDG_DATA_DIRS once, when it's first imported, & creates its directories under $HOME;
+ both are pointed at a scratch directory before any test imports anything of gRunner.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_SCRATCH = Path(tempfile.mkdtemp(prefix="grunner-tests-"))
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ["HOME"] = str(Path(_SCRATCH, "home"))
+os.environ["XDG_DATA_DIRS"] = str(Path(_SCRATCH, "share"))
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,27 @@
+import pytest
+
+from model.applications.applications import PlainApplication, XDGDesktopApplication
+from model.applications.catalogue import Catalogue, Row
+
+
+def _describe(app) -> tuple:
+    return (app.get_name(), app.get_full_path(), app.get_icon(), app.opened_count, app.last_opened_utc,
+            app.first_opened_utc, getattr(app, "exec", None), getattr(app, "terminal", None),
+            getattr(app, "workdir", None))
+
+
+@pytest.mark.parametrize("build", [
+    lambda **kw: PlainApplication("/usr/bin/tool", 3, 20., 10., **kw),
+    lambda **kw: XDGDesktopApplication("/usr/share/applications/top.desktop", "Top", "top", "utilities-terminal",
+                                       3, 20., 10., df_terminal=True, df_path="/tmp", **kw),
+    lambda **kw: XDGDesktopApplication("/usr/share/applications/editor.desktop", "Editor", None, None, **kw),
+])
+def test_standalone_applications_match_catalogued_ones(build):
+    standalone, catalogued = build(), build(catalogue=Catalogue())
+    assert isinstance(standalone._catalogue, Row)
+    assert _describe(standalone) == _describe(catalogued)
+
+    for app in (standalone, catalogued):
+        app.update_opened_count_meta(4).update_last_opened_utc_meta(30.).update_first_opened_utc_meta(None)
+    assert _describe(standalone) == _describe(catalogued)
+    assert str(standalone) == str(catalogued)
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from globals import Configuration, Global
+
+BASE = {
+    Configuration.RECURSIVE: False,
+    Configuration.SHORTCUTS: {},
+    Configuration.PATHS: [],
+    Configuration.GTK: {},
+}
+
+
+@pytest.fixture
+def write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cfg = Path(tmp_path, "config.json")
+    monkeypatch.setattr(Global, "CFG", cfg)
+
+    def write(data: dict):
+        cfg.write_text(json.dumps(data), encoding="utf-8")
+
+    return write
+
+
+def test_workers_default_to_serial(write):
+    write(BASE)
+    assert Configuration().get_workers() == 1
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_workers(write, workers: int):
+    write(BASE | {Configuration.WORKERS: workers})
+    assert Configuration().get_workers() == workers
+
+
+@pytest.mark.parametrize("workers", [0, -1, 2.5, "4", True, None])
+def test_invalid_workers(write, workers):
+    write(BASE | {Configuration.WORKERS: workers})
+    with pytest.raises(ValueError):
+        Configuration()
+
+
+def test_terminal_defaults(write):
+    write(BASE)
+    assert Configuration().get_terminal() == ["xdg-terminal-exec"]
+
+
+@pytest.mark.parametrize("terminal", [[], "kitty", ["kitty", ""], [1], None])
+def test_invalid_terminal(write, terminal):
+    write(BASE | {Configuration.TERMINAL: terminal})
+    with pytest.raises(ValueError):
+        Configuration()
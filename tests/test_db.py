@@ -0,0 +1,22 @@
+from model import db
+
+
+def _rollup(path: str, resolution: int, bucket: int, runtime: float):
+    db.ApplicationUsageRollup.insert(
+        path=path, resolution=resolution, bucket=bucket, samples=1, memory_max=1, memory_sum=1,
+        process_count_max=1, process_count_sum=1, runtime=runtime
+    ).execute()
+
+
+def test_usage_summary_includes_the_days_not_rolled_up_yet():
+    today = 1_700_000_000 // db.DAY * db.DAY
+    yesterday = today - db.DAY
+    # yesterday is complete, & its hours already rolled up into its day; today only has hours so far
+    _rollup("/summary/editor", db.DAY, yesterday, 3 * db.HOUR)
+    _rollup("/summary/editor", db.HOUR, yesterday + 10 * db.HOUR, 3 * db.HOUR)
+    _rollup("/summary/editor", db.HOUR, today + 9 * db.HOUR, db.HOUR)
+    _rollup("/summary/shell", db.HOUR, today + 10 * db.HOUR, 2 * db.HOUR)
+    db._set_watermark(db.DAY, today)
+
+    summary = {stats.path: stats.runtime for stats in db.get_usage_summary(yesterday, 10)}
+    assert summary == {"/summary/editor": 4 * db.HOUR, "/summary/shell": 2 * db.HOUR}
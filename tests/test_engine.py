@@ -0,0 +1,61 @@
+import threading
+from pathlib import Path
+
+from model.engine import Engine
+
+
+class _Configuration:
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+
+    def get_paths(self) -> list[str]:
+        return self.paths
+
+    def get_recursive(self) -> bool:
+        return False
+
+    def get_workers(self) -> int:
+        return 1
+
+    def get_gtk(self) -> dict:
+        return {}
+
+    def get_terminal(self) -> list[str]:
+        return ["xdg-terminal-exec"]
+
+
+def _write_executable(path: Path):
+    path.write_bytes(b"#!/bin/sh\n")
+    path.chmod(0o755)
+
+
+def test_events_during_a_reload_survive_it(tmp_path: Path):
+    _write_executable(Path(tmp_path, "removed"))
+    engine = Engine(_Configuration([str(tmp_path)]))
+    assert str(Path(tmp_path, "removed")) in engine.get_executables()
+
+    # hold the reload's walk back once it's done listing, so that the events below race it
+    finder = engine._Engine__fs_finder
+    walk = finder.walk
+    walked, release = threading.Event(), threading.Event()
+
+    def held_walk(*args, **kwargs):
+        applications = walk(*args, **kwargs)
+        walked.set()
+        release.wait(5)
+        return applications
+
+    finder.walk = held_walk
+    reloaded = engine.reload()
+    assert walked.wait(5)
+
+    _write_executable(Path(tmp_path, "added"))
+    engine.apply_file_event(str(tmp_path), "added", present=True)
+    Path(tmp_path, "removed").unlink()
+    engine.apply_file_event(str(tmp_path), "removed", present=False)
+    release.set()
+    reloaded.result(5)
+
+    executables = engine.get_executables()
+    assert str(Path(tmp_path, "added")) in executables
+    assert str(Path(tmp_path, "removed")) not in executables
@@ -0,0 +1,84 @@
+import random
+import time
+
+import pytest
+
+from globals import Configuration, Global
+from model.applications.applications import XDGDesktopApplication
+from model.applications.catalogue import Catalogue
+from model.applications.crawler import ExecutableFile, FSExecutableFinder
+
+ON_PATH = [f"/generated/bin/{i}" for i in range(4)]
+OFF_PATH = ["/generated/opt/bin", "/generated/deep/tree"]
+
+
+def _filter_naive(executable: list[ExecutableFile], xdg_applications: list[XDGDesktopApplication]):
+    """The nested loop that the indexed filter replaced, as the reference for its output."""
+    common_bins: list[ExecutableFile] = []
+    for xdg in xdg_applications:
+        for binary in executable:
+            if xdg.get_full_path() == binary.fname and binary.is_on_path \
+                    or xdg.get_full_path() == str(binary.get_path()):
+                if binary not in common_bins:
+                    common_bins.append(binary)
+                break
+
+    for binary in common_bins:
+        executable.remove(binary)
+
+
+def _generate(rng: random.Random, binaries: int, entries: int) -> tuple[list[ExecutableFile], list]:
+    """Binaries in walk order, with names shadowed by later directories, & desktop entries executing some of them."""
+    names = [f"app{i}" for i in range(binaries * 2 // 3)]
+    executables = [ExecutableFile(rng.choice(ON_PATH + OFF_PATH), rng.choice(names)) for _ in range(binaries)]
+    executables.sort(key=lambda b: (ON_PATH + OFF_PATH).index(b.dir))
+
+    catalogue = Catalogue()
+    xdg_applications = []
+    for i in range(entries):
+        roll = rng.random()
+        if roll < .4:
+            target = rng.choice(executables).fname
+        elif roll < .7:
+            target = rng.choice(executables).get_path()
+        elif roll < .8 and xdg_applications:
+            target = rng.choice(xdg_applications).get_full_path()
+        else:
+            target = f"/generated/missing/app{i}"
+        xdg_applications.append(XDGDesktopApplication(f"/generated/applications/{i}.desktop", f"App {i}",
+                                                      f"{target} %U", None, catalogue=catalogue))
+    return executables, xdg_applications
+
+
+@pytest.fixture
+def finder(monkeypatch: pytest.MonkeyPatch) -> FSExecutableFinder:
+    monkeypatch.setattr(Global, "PATH_VALUES", ON_PATH)
+    return FSExecutableFinder(Configuration())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_same_output_as_nested_loop(finder: FSExecutableFinder, seed: int):
+    executables, xdg_applications = _generate(random.Random(seed), 1500, 200)
+    expected = executables.copy()
+    _filter_naive(expected, xdg_applications)
+    actual = executables.copy()
+    finder._filter_xdg_from_binary_entries(actual, xdg_applications)
+    assert len(actual) < len(executables)
+    assert [id(b) for b in actual] == [id(b) for b in expected]
+
+
+def test_near_linear_scaling(finder: FSExecutableFinder):
+    def best_of(binaries: int, entries: int) -> float:
+        executables, xdg_applications = _generate(random.Random(0), binaries, entries)
+        timings = []
+        for _ in range(5):
+            copy = executables.copy()
+            st = time.perf_counter()
+            finder._filter_xdg_from_binary_entries(copy, xdg_applications)
+            timings.append(time.perf_counter() - st)
+        return min(timings)
+
+    # 4 times the input: 4 times the work if linear, 16 times if quadratic as the nested loop was
+    small = best_of(2000, 250)
+    large = best_of(8000, 1000)
+    assert large / small < 8, (small, large)
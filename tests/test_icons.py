@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from model import icons
+from model.icons import IconIndex
+
+
+@pytest.fixture
+def base(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    base = Path(tmp_path, "icons")
+    monkeypatch.setattr(icons, "get_icon_base_directories", lambda: [str(base)])
+    monkeypatch.setattr(icons, "get_pixmap_directories", lambda: [])
+    return base
+
+
+def test_symlinked_directories_are_listed_once(tmp_path: Path, base: Path):
+    apps = Path(base, "hicolor", "48x48", "apps")
+    apps.mkdir(parents=True)
+    Path(apps, "firefox.png").touch()
+    # a theme that's a link to another, & a link loop within a theme
+    Path(base, "alias").symlink_to(Path(base, "hicolor"))
+    Path(apps, "loop").symlink_to(Path(base, "hicolor"))
+
+    index = IconIndex(Path(tmp_path, "icons.cache"))
+    index.refresh()
+    inodes = [(st.st_dev, st.st_ino) for st in map(os.stat, index.listings)]
+    assert len(inodes) == len(set(inodes))
+    assert index.resolve("firefox") is not None
+    assert os.path.samefile(index.resolve("firefox"), Path(apps, "firefox.png"))
+
+
+def test_resolve_fallbacks(tmp_path: Path, base: Path):
+    apps = Path(base, "hicolor", "scalable", "apps")
+    apps.mkdir(parents=True)
+    Path(apps, "org.gnome.Terminal.svg").touch()
+    Path(apps, "utilities.svg").touch()
+
+    index = IconIndex(Path(tmp_path, "icons.cache"))
+    index.refresh()
+    assert index.resolve("org.gnome.Terminal") == str(Path(apps, "org.gnome.Terminal.svg"))
+    assert index.resolve("utilities-terminal") == str(Path(apps, "utilities.svg"))
+    assert index.resolve("missing") is None
+    assert index.lookup("utilities-terminal") == str(Path(apps, "utilities.svg"))
@@ -0,0 +1,106 @@
+import itertools
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import ipc
+import ipc_server
+from ipc import Command, IPCClient, Status, notify_running_process, pack_frame
+from ipc_server import IPCServer
+
+_ADDRESSES = itertools.count()
+
+
+def _connect(addr: str) -> IPCClient:
+    # the server starts listening on its own thread
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            client = IPCClient(addr)
+            # a server that died fails the test, rather than hanging it
+            client.sock.settimeout(5)
+            return client
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(.01)
+
+
+@pytest.fixture
+def server():
+    addr = f"\0grunner-test-{os.getpid()}-{next(_ADDRESSES)}"
+    srv = IPCServer(addr, {Command.QUERY: lambda payload: payload.upper()})
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield addr, thread
+    srv.stop()
+    thread.join(5)
+
+
+def test_pipelined_requests(server):
+    addr, _ = server
+    with _connect(addr) as client:
+        ids = [client.send(Command.QUERY, f"query {i}".encode()) for i in range(10)]
+        replies = dict((rid, (status, payload)) for rid, status, payload in (client.receive() for _ in ids))
+    assert replies == {rid: (Status.OK, f"QUERY {i}".encode()) for i, rid in enumerate(ids)}
+
+
+def test_client_gone_mid_inbox(server):
+    addr, thread = server
+    # replying to the first frame fails, since the client won't read anymore; the rest of the inbox must be dropped
+    with _connect(addr) as client:
+        client.sock.shutdown(socket.SHUT_RD)
+        client.sock.sendall(b"".join(pack_frame(255, i) for i in range(50)))
+    time.sleep(.1)
+
+    assert thread.is_alive()
+    with _connect(addr) as client:
+        assert client.request(Command.QUERY, b"still here") == (Status.OK, b"STILL HERE")
+
+
+def test_failed_accept(server, monkeypatch: pytest.MonkeyPatch):
+    addr, thread = server
+
+    def get_peer_uid(sock: socket.socket) -> int:
+        raise OSError("no credentials")
+
+    with monkeypatch.context() as m:
+        m.setattr(ipc_server, "get_peer_uid", get_peer_uid)
+        with _connect(addr) as client:
+            with pytest.raises(ConnectionError):
+                client.request(Command.QUERY)
+
+    assert thread.is_alive()
+    with _connect(addr) as client:
+        assert client.request(Command.QUERY, b"still here") == (Status.OK, b"STILL HERE")
+
+
+def test_wedged_server_times_out():
+    # listening, but never accepting nor replying
+    addr = f"\0grunner-test-{os.getpid()}-{next(_ADDRESSES)}"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as wedged:
+        wedged.bind(addr)
+        wedged.listen()
+        st = time.monotonic()
+        with pytest.raises(TimeoutError):
+            notify_running_process(addr, Command.START_GUI, timeout=.2)
+        assert time.monotonic() - st < 2
+
+
+def test_client_refuses_server_of_another_user(server, monkeypatch: pytest.MonkeyPatch):
+    addr, _ = server
+    _connect(addr).close()
+    monkeypatch.setattr(ipc, "get_peer_uid", lambda sock: os.getuid() + 1)
+    with pytest.raises(PermissionError):
+        IPCClient(addr)
+
+
+def test_taken_address_fails_to_bind(server):
+    addr, _ = server
+    _connect(addr).close()
+    with pytest.raises(OSError):
+        IPCServer(addr, {}).bind()
+
@@ -0,0 +1,102 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from model.launcher import Launcher, compile_exec, expand_exec
+from model.telemetry import TrackedApplication
+
+
+def _state(pid: int) -> str:
+    with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+        return f.read().rpartition(")")[2].split()[0]
+
+
+def test_spawned_child_is_not_reaped_before_on_spawned():
+    states: list[str] = []
+
+    def on_spawned(pid: int):
+        # true has long exited by now, but only the reaper may reap it, & it doesn't know about it yet
+        time.sleep(.2)
+        states.append(_state(pid))
+
+    pid = Launcher().spawn(["true"], on_spawned)
+    assert states == ["Z"]
+    deadline = time.monotonic() + 5
+    while os.path.exists(f"/proc/{pid}") and time.monotonic() < deadline:
+        time.sleep(.01)
+    assert not os.path.exists(f"/proc/{pid}")
+
+
+def test_tracked_files_stay_bound_to_the_launched_process():
+    tracked: list[TrackedApplication] = []
+
+    def on_spawned(pid: int):
+        app = TrackedApplication("sleep", pid, time.time())
+        app.open_files(pid)
+        tracked.append(app)
+
+    Launcher().spawn(["sleep", ".1"], on_spawned)
+    app, = tracked
+    assert app.sample() is not None
+    time.sleep(.5)
+    # exited & reaped: whatever the pid is now, the open files still belong to the dead process
+    assert app.sample() is None
+
+
+def _wait_for(path: Path) -> str:
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(.01)
+    return path.read_text()
+
+
+def test_spawned_in_working_directory(tmp_path: Path):
+    out = Path(tmp_path, "out")
+    launcher = Launcher()
+    pid = launcher.spawn(["sh", "-c", f'echo "$$ $PWD" > {out}.tmp && mv {out}.tmp {out}'], cwd=str(tmp_path))
+    # the trampoline execs in place, so the pid is the entry's own
+    assert _wait_for(out).split() == [str(pid), str(tmp_path)]
+
+
+def test_missing_working_directory_raises(tmp_path: Path):
+    with pytest.raises(OSError):
+        Launcher().spawn(["true"], cwd=str(Path(tmp_path, "missing")))
+
+
+def test_terminal_entries_run_in_the_terminal(tmp_path: Path):
+    out = Path(tmp_path, "out")
+    launcher = Launcher()
+    # a "terminal" that records what it was asked to run
+    launcher.terminal = ["sh", "-c", f'echo "$@" > {out}.tmp && mv {out}.tmp {out}', "terminal"]
+    launcher.spawn(["htop", "--tree"], terminal=True)
+    assert _wait_for(out).split() == ["htop", "--tree"]
+
+
+def test_empty_exec_raises():
+    with pytest.raises(ValueError):
+        Launcher().spawn(expand_exec(compile_exec("%U", "Nothing", None, "/nothing.desktop")))
+
+
+def test_tracked_without_children_lists(monkeypatch: pytest.MonkeyPatch):
+    # as on kernels without CONFIG_PROC_CHILDREN
+    real_open = os.open
+
+    def open_(path, *args, **kwargs):
+        if str(path).endswith("/children"):
+            raise FileNotFoundError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "open", open_)
+    tracked: list[TrackedApplication] = []
+
+    def on_spawned(pid: int):
+        app = TrackedApplication("sleep", pid, time.time())
+        app.open_files(pid)
+        tracked.append(app)
+
+    Launcher().spawn(["sleep", ".3"], on_spawned)
+    app, = tracked
+    memory, count = app.sample()
+    assert memory > 0 and count == 1
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from model.search import SearchIndex, SearchSession, max_errors_for
+
+NAMES = ["firefox", "firefox-developer-edition", "thunderbird", "gnome-terminal", "gnome-text-editor", "gedit",
+         "texteditor", "xterm", "terminator", "code", "codium", "libreoffice-writer", "ctl-edit", "systemctl",
+         "Steam", "steamcmd", "python3", "python3.12", "pydoc", "git", "gitk", "git-gui"]
+
+
+def _levenshtein_substring(query: str, key: str) -> int:
+    """Fewest edits that turn query into a substring of key."""
+    row = [0] * (len(key) + 1)
+    for i, c in enumerate(query, 1):
+        previous, row = row, [i] + [0] * len(key)
+        for j, k in enumerate(key, 1):
+            row[j] = min(previous[j - 1] + (c != k), previous[j] + 1, row[j - 1] + 1)
+    return min(row)
+
+
+@pytest.fixture
+def index() -> SearchIndex:
+    return SearchIndex((name, name) for name in NAMES)
+
+
+@pytest.mark.parametrize("query", ["fire", "fxre", "term", "texteditor", "ctledit", "py", "STEAM", "zzzz", "g"])
+def test_matches_are_within_tolerated_errors(index: SearchIndex, query: str):
+    q = query.lower()
+    expected = {name for name in NAMES if _levenshtein_substring(q, name.lower()) <= max_errors_for(q)}
+    assert set(index.search(query, len(NAMES))) == expected
+
+
+def test_ranking(index: SearchIndex):
+    # exact before fuzzy, prefixes before infixes, shorter before longer
+    assert index.search("git", 4) == ["git", "gitk", "git-gui"]
+    assert index.search("term", 3) == ["terminator", "xterm", "gnome-terminal"]
+    assert index.search("fxre", 1) == ["firefox"]
+
+
+def test_updates(index: SearchIndex):
+    index.remove("firefox")
+    assert "firefox" not in index.search("fire", len(NAMES))
+    index.add("Firefox-Nightly", "nightly")
+    index.add("a-key-longer-than-any-other-firefox", "long")
+    assert index.search("fire", 3) == ["nightly", "firefox-developer-edition", "long"]
+    index.remove("nightly")
+    assert index.search("fire", 2) == ["firefox-developer-edition", "long"]
+
+
+def test_session_matches_one_shot_search(index: SearchIndex):
+    rng = random.Random(0)
+    session = SearchSession(lambda: index)
+    query = ""
+    for step in range(400):
+        if query and rng.random() < .3:
+            query = query[:-rng.randint(1, len(query))]
+        else:
+            query += rng.choice("abcdefgilmnoprstxy-")
+        if step % 50 == 49:
+            # in-place updates invalidate whatever the session read so far
+            name = rng.choice(NAMES)
+            index.remove(name)
+            index.add(name[::-1], name)
+        assert session.search(query, 5) == index.search(query, 5), query
+
+
+def test_updates_are_compacted():
+    index = SearchIndex((f"app{i}", i) for i in range(1000))
+    session = SearchSession(lambda: index)
+    for step in range(5000):
+        # as the watcher does for every modified entry
+        i = step % 1000
+        index.remove(i)
+        index.add(f"app{i}", i)
+        if step % 500 == 0:
+            assert session.search("app12", 5) == index.search("app12", 5)
+    assert len(index) == 1000
+    assert len(index.keys) <= 1000 * 1.25 + 64
+    assert index.search("app999", 1) == [999]
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+
+from model.applications.crawler import FSExecutableFinder
+
+
+class _Configuration:
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+
+    def get_paths(self) -> list[str]:
+        return self.paths
+
+    def get_recursive(self) -> bool:
+        return False
+
+    def get_workers(self) -> int:
+        return 1
+
+
+def test_unchanged_directories_come_from_the_snapshot(tmp_path: Path):
+    Path(tmp_path, "tool").write_bytes(b"#!/bin/sh\n")
+    Path(tmp_path, "tool").chmod(0o755)
+    finder = FSExecutableFinder(_Configuration([str(tmp_path)]))
+    assert str(Path(tmp_path, "tool")) in finder.walk()
+
+    listing = finder.snapshot.directories[str(tmp_path)]
+    finder.walk()
+    assert finder.snapshot.directories[str(tmp_path)] is listing
+
+
+def test_rescan_sees_changed_modes(tmp_path: Path):
+    script = Path(tmp_path, "script")
+    script.write_bytes(b"#!/bin/sh\n")
+    script.chmod(0o644)
+    finder = FSExecutableFinder(_Configuration([str(tmp_path)]))
+    assert str(script) not in finder.walk()
+
+    # a mode change doesn't touch the directory's mtime, so the snapshot can't tell
+    mtime_ns = os.stat(tmp_path).st_mtime_ns
+    script.chmod(0o755)
+    assert os.stat(tmp_path).st_mtime_ns == mtime_ns
+    assert str(script) not in finder.walk()
+    assert str(script) in finder.walk(rescan=True)
+    assert str(script) in finder.walk()
+
+
+def _describe(applications: dict) -> list[tuple]:
+    return [(path, type(app).__name__, app.get_name(), app.get_icon(), getattr(app, "terminal", None),
+             getattr(app, "workdir", None)) for path, app in applications.items()]
+
+
+def test_unchanged_catalogue_is_restored_from_the_dump(tmp_path: Path, monkeypatch):
+    Path(tmp_path, "tool").write_bytes(b"#!/bin/sh\n")
+    Path(tmp_path, "tool").chmod(0o755)
+    entry = Path(tmp_path, "editor.desktop")
+    entry.write_text("[Desktop Entry]\nType=Application\nName=Editor\nExec=editor %F\nIcon=editor\n")
+    console = Path(tmp_path, "console.desktop")
+    console.write_text("[Desktop Entry]\nType=Application\nName=Top\nExec=top\nTerminal=true\nPath=/tmp\n")
+    cold = FSExecutableFinder(_Configuration([str(tmp_path)])).walk()
+
+    # a fresh finder, as on a warm start; nothing is listed nor parsed again
+    finder = FSExecutableFinder(_Configuration([str(tmp_path)]))
+    monkeypatch.setattr(finder, "_join_application_entries", None)
+    warm = finder.walk()
+    assert _describe(warm) == _describe(cold)
+    assert (warm[str(console)].terminal, warm[str(console)].workdir) == (True, "/tmp")
+    assert (warm[str(entry)].terminal, warm[str(entry)].workdir) == (False, None)
+
+
+def test_edited_desktop_entry_invalidates_the_dump(tmp_path: Path):
+    entry = Path(tmp_path, "editor.desktop")
+    entry.write_text("[Desktop Entry]\nType=Application\nName=Editor\nExec=editor %F\n")
+    finder = FSExecutableFinder(_Configuration([str(tmp_path)]))
+    assert finder.walk()[str(entry)].get_name() == "Editor"
+
+    # edited in place, which doesn't touch the directory's mtime
+    mtime_ns = os.stat(tmp_path).st_mtime_ns
+    entry.write_text("[Desktop Entry]\nType=Application\nName=Text Editor\nExec=editor %F\n")
+    assert os.stat(tmp_path).st_mtime_ns == mtime_ns
+    assert FSExecutableFinder(_Configuration([str(tmp_path)])).walk()[str(entry)].get_name() == "Text Editor"
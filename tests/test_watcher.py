@@ -0,0 +1,117 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from model.watcher import CatalogueWatcher
+
+
+class _Configuration:
+    def __init__(self, paths: list[str], recursive: bool):
+        self.paths = paths
+        self.recursive = recursive
+
+    def get_paths(self) -> list[str]:
+        return self.paths
+
+    def get_recursive(self) -> bool:
+        return self.recursive
+
+
+class _Engine:
+    """Records what the watcher forwards."""
+
+    def __init__(self):
+        self.events: list[tuple] = []
+
+    def apply_file_event(self, directory: str, fname: str, present: bool):
+        self.events.append((directory, fname, present))
+
+    def apply_directory_event(self, directory: str):
+        self.events.append((directory,))
+
+    def wait_for(self, *events: tuple, timeout: float = 5) -> bool:
+        """Whether any of events is forwarded within timeout."""
+        deadline = time.monotonic() + timeout
+        while not any(event in self.events for event in events):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(.01)
+        return True
+
+
+@pytest.fixture
+def watch(tmp_path: Path):
+    watchers: list[CatalogueWatcher] = []
+
+    def watch(paths: list[Path], recursive: bool = False) -> _Engine:
+        engine = _Engine()
+        watcher = CatalogueWatcher(_Configuration([str(p) for p in paths], recursive), engine)
+        watcher.start()
+        watchers.append(watcher)
+        return engine
+
+    yield watch
+    for w in watchers:
+        w.stop()
+
+
+def test_files(tmp_path: Path, watch):
+    engine = watch([tmp_path])
+    Path(tmp_path, "tool").write_bytes(b"#!/bin/sh\n")
+    assert engine.wait_for((str(tmp_path), "tool", True))
+    os.remove(Path(tmp_path, "tool"))
+    assert engine.wait_for((str(tmp_path), "tool", False))
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_missing_directory_is_picked_up_once_created(tmp_path: Path, watch, recursive: bool):
+    bin_ = Path(tmp_path, "home", ".local", "bin")
+    engine = watch([bin_], recursive)
+
+    # created a level at a time, as mkdir -p does
+    bin_.mkdir(parents=True)
+    Path(bin_, "early").write_bytes(b"#!/bin/sh\n")
+    # written either before the watch was in place, & picked up with the directory, or after
+    assert engine.wait_for((str(bin_), "early", True), *[(str(bin_),)] * recursive)
+
+    Path(bin_, "late").write_bytes(b"#!/bin/sh\n")
+    assert engine.wait_for((str(bin_), "late", True))
+    # nothing of the ancestors is forwarded
+    assert all(event[0] == str(bin_) for event in engine.events)
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_removed_directory_is_dropped_then_picked_up_again(tmp_path: Path, watch, recursive: bool):
+    bin_ = Path(tmp_path, "bin")
+    bin_.mkdir()
+    engine = watch([bin_], recursive)
+
+    shutil.rmtree(bin_)
+    assert engine.wait_for((str(bin_),))
+
+    engine.events.clear()
+    bin_.mkdir()
+    Path(bin_, "tool").write_bytes(b"#!/bin/sh\n")
+    assert engine.wait_for((str(bin_), "tool", True), *[(str(bin_),)] * recursive)
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_moved_directory_is_dropped_then_picked_up_again(tmp_path: Path, watch, recursive: bool):
+    bin_ = Path(tmp_path, "bin")
+    bin_.mkdir()
+    engine = watch([bin_], recursive)
+
+    moved = Path(tmp_path, "moved")
+    bin_.rename(moved)
+    assert engine.wait_for((str(bin_),))
+    # the watch didn't follow it
+    Path(moved, "stale").write_bytes(b"#!/bin/sh\n")
+
+    engine.events.clear()
+    bin_.mkdir()
+    Path(bin_, "tool").write_bytes(b"#!/bin/sh\n")
+    assert engine.wait_for((str(bin_), "tool", True), *[(str(bin_),)] * recursive)
+    assert not any("stale" in event for event in engine.events)
@@ -0,0 +1,185 @@
+"""
+gRunner's tracing module.
+Spans are timed with the monotonic clock & recorded twice: into a per-name latency histogram, which lives as long as
+ the process does, & into a bounded ring of events, which is exported in the Chrome trace event format
+ (chrome://tracing, https://ui.perfetto.dev), where spans of the same thread nest by time:
+    https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+Histograms are log-linear, as in HdrHistogram: exact up to 64us, & within 1/32 of the value above that, in constant
+ memory per name regardless of the amount of samples. Sticks to the standard library, like ipc.
+"""
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Optional
+
+from globals import Global
+
+# exported traces kept in the logs directory; older ones are removed by every export
+KEPT_TRACES = 5
+
+
+class Histogram:
+    # 2 ** SUB_BITS buckets for every power of 2
+    SUB_BITS = 5
+    PERCENTILES = (.5, .9, .99, .999)
+
+    def __init__(self):
+        self.counts: list[int] = []
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < 2 << Histogram.SUB_BITS:
+            return value
+        shift = value.bit_length() - Histogram.SUB_BITS - 1
+        return (shift << Histogram.SUB_BITS) + (value >> shift)
+
+    @staticmethod
+    def _highest_equivalent(index: int) -> int:
+        if index < 2 << Histogram.SUB_BITS:
+            return index
+        shift = (index >> Histogram.SUB_BITS) - 1
+        return ((index - (shift << Histogram.SUB_BITS) + 1) << shift) - 1
+
+    def record(self, value: int):
+        """Record value (a non-negative int, in any unit; tracers use microseconds)."""
+        index = Histogram._index(value)
+        if index >= len(self.counts):
+            self.counts += [0] * (index + 1 - len(self.counts))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> int:
+        """Smallest recorded value that q of all values are less than or equal to, within the bucket's precision."""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(Histogram._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "min": self.min or 0,
+            "mean": self.total / self.count if self.count else 0,
+            **{f"p{q * 100:g}": self.percentile(q) for q in Histogram.PERCENTILES},
+            "max": self.max,
+        }
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Optional[dict[str, Any]]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        self.tracer.record(self.name, self.start, args=self.args)
+
+
+class Tracer:
+    def __init__(self, capacity: int = 1 << 16):
+        self.histograms: dict[str, Histogram] = {}
+        # (name, start ns, duration ns, thread id, args) of the latest spans, oldest first
+        self.events: deque[tuple[str, int, int, int, Optional[dict[str, Any]]]] = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+
+    def span(self, name: str, **args) -> Span:
+        """Time the with block as name; nested spans are simply spans that start & end within it."""
+        return Span(self, name, args or None)
+
+    def record(self, name: str, start_ns: int, end_ns: Optional[int] = None, args: Optional[dict[str, Any]] = None):
+        """
+        Record a span started at start_ns & ending at end_ns (or now), both perf_counter_ns() values; for latencies
+         that start on one thread & end on another, such as a keystroke & its rendered results.
+        """
+        duration = (end_ns if end_ns is not None else perf_counter_ns()) - start_ns
+        with self.lock:
+            if (histogram := self.histograms.get(name)) is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(duration // 1000)
+            self.events.append((name, start_ns, duration, threading.get_ident(), args))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Latency summary of every span name, in microseconds."""
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def export(self, path: Optional[Path] = None) -> Path:
+        """
+        Write the recorded events & histograms as a Chrome trace, into the logs directory unless path is given, which
+         only keeps the latest KEPT_TRACES of them; raises OSError if it can't be written.
+        """
+        if path is None:
+            path = Path(Global.LOGS, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.json")
+            _prune(path.parent, KEPT_TRACES - 1)
+        with self.lock:
+            events = list(self.events)
+        pid = os.getpid()
+        threads = {t.ident: t.name for t in threading.enumerate()}
+
+        trace: list[dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        for name, start, duration, tid, args in events:
+            event = {"name": name, "cat": name.partition(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                     "ts": start / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            trace.append(event)
+
+        # write & rename, so that nothing ever reads a truncated trace
+        tmp = path.with_suffix(".tmp")
+        with tmp.open(mode="w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"histograms": self.snapshot()}}, f)
+        os.replace(tmp, path)
+        return path
+
+
+def _prune(directory: Path, keep: int):
+    """Remove all but the newest keep traces of directory."""
+    traces = sorted(directory.glob("trace-*.json"), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+    for path in traces[keep:]:
+        path.unlink(missing_ok=True)
+
+
+# the process-wide tracer
+tracer = Tracer()
+
+
+def traced(name: str):
+    """Record every call of the decorated function as a span called name."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
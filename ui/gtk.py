@@ -1,11 +1,20 @@
 import functools
 import os
 import re
+import time
+from concurrent.futures import Future
 from enum import Enum
 from typing import Callable, Any, Optional
-from ui.resources import XML, get_resource
+from ui.resources import XML, get_resource_bytes
 from globals import Global, Configuration
+from model import db
+from model.applications.applications import Application
 from model.engine import Engine
+from model.icons import icon_index
+from ui.icons import textures
+from ui.results import FALLBACK_ICON, ICON_SIZE, ResultStore, create_result_factory
+from ui.scheduler import SearchScheduler
+from tracing import tracer
 
 from loguru import logger
 
@@ -13,63 +22,64 @@ import gi
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import Gtk, Adw
+from gi.repository import Gdk, Gtk, Adw, GLib, Pango
+
+
+# composite widgets: GTK precompiles their templates once, when the class is initialised
+@Gtk.Template(string=get_resource_bytes(XML.TEMPLATE_BOX))
+class GnomeBox(Gtk.Box):
+    __gtype_name__ = "GRunnerGnomeBox"
+
+
+@Gtk.Template(string=get_resource_bytes(XML.GNOME_BTN))
+class GnomeButton(Gtk.Button):
+    """Quick-launch button of one of the most frecent applications."""
+    __gtype_name__ = "GRunnerGnomeButton"
+
+    def __init__(self):
+        super().__init__()
+        self.app: Optional[Application] = None
+        self.img: Gtk.Image = Gtk.Image.new_from_icon_name(FALLBACK_ICON)
+        self.img.set_pixel_size(ICON_SIZE)
+        self.lbl: Gtk.Label = Gtk.Label()
+        self.lbl.set_ellipsize(Pango.EllipsizeMode.END)
+        self.lbl.set_max_width_chars(10)
+
+        bx: Gtk.Box = Gtk.Box.new(Gtk.Orientation.VERTICAL, 5)
+        bx.append(self.img)
+        bx.append(self.lbl)
+        self.set_child(bx)
+
+    def bind(self, app: Optional[Application]):
+        self.app = app
+        self.set_sensitive(app is not None)
+        self.lbl.set_label(app.get_name() if app is not None else "")
+        self.set_tooltip_text(app.get_readable_path() if app is not None else None)
+
+        # same as the result rows: only icons the engine already resolved, decoded off the main loop
+        texture = None
+        if app is not None and (path := icon_index.lookup(app.get_icon() or FALLBACK_ICON)):
+            size = ICON_SIZE * self.get_scale_factor()
+            texture = textures.get(path, size, functools.partial(self._on_texture, app))
+        if texture is not None:
+            self.img.set_from_paintable(texture)
+        else:
+            self.img.set_from_icon_name(FALLBACK_ICON)
+
+    def _on_texture(self, app: Application, texture: Gdk.Texture):
+        # the button may show another application by now
+        if self.app is app:
+            self.img.set_from_paintable(texture)
 
 
 class XMLStaticFactory:
 
     @staticmethod
-    def create_result_box_inflatant(readable_name, path, gnome_img) -> Gtk.Box:
-        readable_lbl: Gtk.Label = Gtk.Label()
-        readable_lbl.set_markup(f"<b>{readable_name}</b>")
-        readable_lbl.set_can_focus(False)
-        readable_lbl.set_can_target(False)
-        readable_lbl.set_halign(Gtk.Align.START)
-        readable_lbl.set_wrap(True)
-        readable_lbl.set_wrap_mode(Gtk.WrapMode.CHAR)
-        readable_lbl.set_max_width_chars(30)
-
-        path_lbl: Gtk.Label = Gtk.Label()
-        path_lbl.set_markup(f"<i>{path}</i>")
-        path_lbl.set_can_focus(False)
-        path_lbl.set_can_target(False)
-        path_lbl.set_sensitive(False)
-        path_lbl.set_halign(Gtk.Align.START)
-        path_lbl.set_wrap(True)
-        path_lbl.set_wrap_mode(Gtk.WrapMode.CHAR)
-        path_lbl.set_max_width_chars(30)
-
-        root_lbl_bx: Gtk.Box = Gtk.Box.new(Gtk.Orientation.VERTICAL, 0)
-        root_lbl_bx.set_can_focus(False)
-        root_lbl_bx.set_can_target(False)
-        root_lbl_bx.set_hexpand(True)
-
-        root_lbl_bx.append(readable_lbl)
-        root_lbl_bx.append(path_lbl)
-
-        img: Gtk.Image = Gtk.Image.new()
-        img.set_can_focus(False)
-        img.set_can_target(False)
-        img.set_from_icon_name(gnome_img)
-
-        root: Gtk.Box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 10)
-        root.set_margin_start(10)
-        root.set_margin_end(10)
-        root.set_can_focus(False)
-        root.set_can_target(False)
-        root.set_hexpand(False)
-
-        root.append(img)
-        root.append(root_lbl_bx)
-
-        return root
-
-    @staticmethod
-    def create_result_list_box_row_inflatant(child, on_activate: Callable[[], None]):
-        row = Gtk.ListBoxRow()
-        row.set_child(child)
-        row.connect("activate", on_activate)
-        return row
+    def build(resource: XML) -> Gtk.Builder:
+        """A builder over resource, whose XML is only ever read from disk once."""
+        builder = Gtk.Builder()
+        builder.add_from_string(get_resource_bytes(resource).decode())
+        return builder
 
     @staticmethod
     def create_key_event_controller(
@@ -107,51 +117,41 @@ class XMLStaticFactory:
 
     @staticmethod
     def get_root() -> tuple[Gtk.Builder, Adw.ApplicationWindow]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.ROOT))
+        builder = XMLStaticFactory.build(XML.ROOT)
         return builder, builder.get_object("root")
 
     @staticmethod
     def get_template_modal() -> tuple[Gtk.Builder, Adw.Window]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.TEMPLATE_MODAL))
+        builder = XMLStaticFactory.build(XML.TEMPLATE_MODAL)
         return builder, builder.get_object("template_dialog")
 
     @staticmethod
     def get_dialog_stack_box() -> tuple[Gtk.Builder, Gtk.Box]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.DIALOG_STACK))
+        builder = XMLStaticFactory.build(XML.DIALOG_STACK)
         return builder, builder.get_object("dialog_stack_box")
 
     @staticmethod
     def get_settings_box() -> tuple[Gtk.Builder, Gtk.Box]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.SETTINGS_BOX))
+        builder = XMLStaticFactory.build(XML.SETTINGS_BOX)
         return builder, builder.get_object("settings_box")
 
     @staticmethod
     def get_app_usage_box() -> tuple[Gtk.Builder, Gtk.Box]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.APP_USAGE_BOX))
+        builder = XMLStaticFactory.build(XML.APP_USAGE_BOX)
         return builder, builder.get_object("app_usage_box")
 
     @staticmethod
     def get_about_box() -> tuple[Gtk.Builder, Gtk.Box]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.ABOUT_BOX))
+        builder = XMLStaticFactory.build(XML.ABOUT_BOX)
         return builder, builder.get_object("about_box")
 
     @staticmethod
-    def get_application_box() -> tuple[Gtk.Builder, Gtk.Box]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.TEMPLATE_BOX))
-        return builder, builder.get_object("gnome_box")
+    def get_application_box() -> Gtk.Box:
+        return GnomeBox()
 
     @staticmethod
-    def get_application_button() -> tuple[Gtk.Builder, Gtk.Button]:
-        builder = Gtk.Builder()
-        builder.add_from_file(get_resource(XML.GNOME_BTN))
-        return builder, builder.get_object("gnome_btn")
+    def get_application_button() -> GnomeButton:
+        return GnomeButton()
 
 
 class Modal:
@@ -192,7 +192,7 @@ class Modal:
             XMLStaticFactory.create_gtk_shortcut(
                 "Escape",
                 Gtk.CallbackAction.new(
-                    callback=self._destroy
+                    callback=self._close
                 )
             )
         )
@@ -202,24 +202,27 @@ class Modal:
         for key, func in self.actions.items():
             self.win.connect(key, func)
 
-        self.win.connect("close-request", self._destroy)
+        self.win.connect("close-request", self._close)
 
     def present(self):
         self.win.set_transient_for(self.parent)
         self.win.present()
 
-    def _destroy(self, *args, **kwargs):
+    def _close(self, *args, **kwargs):
         for key, func in self.actions.items():
             if "destroy" in key or "close" in key:
                 func()
 
-        self.win.destroy()
+        # modals are kept around & re-presented, rather than rebuilt every time
+        self.win.set_visible(False)
+        return True
 
 
 class SettingsModal:
     # FIXME reset gnome entry btn state & reset focus as well
-    def __init__(self, cfg: Configuration, parent: Gtk.ApplicationWindow | Adw.ApplicationWindow,
+    def __init__(self, cfg: Configuration, apps: Engine, parent: Gtk.ApplicationWindow | Adw.ApplicationWindow,
                  actions: dict[str, Callable] = None):
+        self.apps = apps
         builder, dialog_stack_box = XMLStaticFactory.get_dialog_stack_box()
         dialog_stack: Gtk.Stack = builder.get_object("dialog_stack")
         dialog_stack_switcher: Gtk.StackSwitcher = builder.get_object("dialog_stack_switcher")
@@ -228,7 +231,9 @@ class SettingsModal:
                                           "settings",
                                           "Settings",
                                           "applications-system-symbolic")
-        dialog_stack.add_titled_with_icon(XMLStaticFactory.get_app_usage_box()[1],
+        self.usage_box: Gtk.Box = XMLStaticFactory.get_app_usage_box()[1]
+        self.usage_lbls: list[Gtk.Label] = []
+        dialog_stack.add_titled_with_icon(self.usage_box,
                                           "usage",
                                           "Statistics",
                                           "applications-multimedia-symbolic")
@@ -252,9 +257,39 @@ class SettingsModal:
     def _setup_dialog_stack(self):
         pass
 
+    def _update_usage_box(self):
+        for lbl in self.usage_lbls:
+            self.usage_box.remove(lbl)
+        self.usage_lbls.clear()
+
+        # served from the rollups, so this stays fast no matter how much history there is
+        for stats in db.get_usage_summary(time.time() - 7 * db.DAY, 10):
+            lbl: Gtk.Label = Gtk.Label()
+            lbl.set_markup(
+                f"<b>{GLib.markup_escape_text(self._get_name(stats.path))}</b> "
+                f"{stats.runtime / db.HOUR:.1f}h, "
+                f"<i>{stats.memory_avg / 2 ** 20:.0f} MiB avg, {stats.memory_max / 2 ** 20:.0f} MiB max</i>"
+            )
+            lbl.set_halign(Gtk.Align.START)
+            lbl.set_margin_start(10)
+            lbl.set_margin_top(5)
+            self.usage_box.append(lbl)
+            self.usage_lbls.append(lbl)
+
+    def _get_name(self, path: str) -> str:
+        # the name the results show; applications that are gone (or not walked yet) only have their path left
+        if self.apps.get_ready().done() and (app := self.apps.get_executable(path)) is not None:
+            return app.get_name()
+        return os.path.basename(path)
+
     def present(self):
+        # statistics are the only part that goes stale between presentations
+        self._update_usage_box()
         self.modal.present()
 
+    def close(self):
+        self.modal.win.set_visible(False)
+
 
 class AboutModal:
     def __init__(self, parent):
@@ -274,20 +309,28 @@ class GRunner(Adw.Application):
     # TODO set gnome buttons to be a configurable amount, make sure the regex matches it correctly as well
     #  if the rows are more than 1, the regex should be 11 for row 1 column 1, 22 for row 2 column 2 etc...
 
+    RESULT_COUNT = 50
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.shortcut_controller_global: Gtk.ShortcutController = Gtk.ShortcutController()
         self.shortcut_controller_global.set_scope(Gtk.ShortcutScope.GLOBAL)
 
+        # the window is built once & only ever hidden, so that summoning it again is just a present()
         builder, self.win = XMLStaticFactory.get_root()
+        self.win.set_hide_on_close(True)
         self.entry: Gtk.Entry = builder.get_object("root_bx_entry")
         self.gnome_box_wrapper: Gtk.Entry = builder.get_object("root_gnome_bx")
 
         self.cached_button_state = False
         self.res_win: Gtk.ScrolledWindow = builder.get_object("root_res_win")
-        self.res_lstbx: Gtk.ListBox = builder.get_object("root_res_lstbx")
+        self.res_lstvw: Gtk.ListView = builder.get_object("root_res_lstvw")
+        self.res_store = ResultStore()
+        self.res_lstvw.set_model(Gtk.SingleSelection.new(self.res_store))
+        self.res_lstvw.set_factory(create_result_factory())
 
-        # we are lazy loading this because upon initialization, this will load all the data & formatting
+        # we are lazy loading this because upon initialization, this will load all the data & formatting;
+        #  once built, it's reused for the lifetime of the process
         self.modal: Optional[SettingsModal] = None
         self.modal_is_active = False
 
@@ -299,22 +342,50 @@ class GRunner(Adw.Application):
         self.cfg_model: Optional[Configuration] = None
         self.app_model: Optional[Engine] = None
 
+        self.search_scheduler: Optional[SearchScheduler] = None
+
         self._add_controllers()
-        self.__inflate_listbox_with_mock()
 
         self.connect('activate', self._on_activate)
 
     def load_model(self, cfg: Configuration, apps: Engine):
         self.cfg_model = cfg
         self.app_model = apps
+        self.search_scheduler = SearchScheduler(
+            apps.create_name_search_session(),
+            self.RESULT_COUNT,
+            self._show_results
+        )
 
         self._inflate_application_buttons()
-        # TODO get & set icons of the N most recent applicationgnome btns
+        # filled on every summon; the first walk may still be running, in which case they're filled once it's done
+        apps.get_ready().add_done_callback(lambda _: GLib.idle_add(self._update_application_buttons))
 
     def _on_activate(self, app):
         """Create the main UI."""
         self.win.set_application(app)
-        self.win.present()
+        # stay alive while the window is hidden; only a shutdown releases the application
+        self.hold()
+        self.summon()
+
+    def summon(self, requested_ns: Optional[int] = None) -> bool:
+        """Reset the window to a fresh state & present it. Must run on the GTK main loop."""
+        with tracer.span("ui.present"):
+            self._clear_entry()
+            self._update_application_buttons()
+            self.win.present()
+            self.entry.grab_focus()
+        if requested_ns is not None:
+            tracer.record("ui.summon", requested_ns)
+        return GLib.SOURCE_REMOVE
+
+    def request_summon(self):
+        """Thread-safe summon; its latency, main loop wait included, is recorded as "ui.summon"."""
+        GLib.idle_add(self.summon, time.perf_counter_ns())
+
+    def request_shutdown(self):
+        """Thread-safe shutdown."""
+        GLib.idle_add(self._nuke, self.ExitStatus.SHUTDOWN)
 
     def _add_controllers(self):
         self.entry.connect(
@@ -326,6 +397,11 @@ class GRunner(Adw.Application):
             self._entry_progressive_callback
         )
 
+        self.res_lstvw.connect(
+            "activate",
+            self._result_callback
+        )
+
         self.entry.connect(
             'icon-press',
             self._handle_entry_icon_buttons
@@ -418,6 +494,30 @@ class GRunner(Adw.Application):
 
             self.cached_button_state = bool(s)
 
+        self.search_scheduler.submit(s)
+
+    def _show_results(self, query: str, apps: list):
+        self.res_store.update(apps)
+
+    def _result_callback(self, list_view: Gtk.ListView, position: int):
+        if (item := self.res_store.get_item(position)) is None:
+            return
+        self._launch(item.app)
+
+    def _gnome_btn_callback(self, btn: GnomeButton):
+        if btn.app is None:
+            return
+        self._launch(btn.app)
+
+    def _launch(self, app: Application):
+        try:
+            self.app_model.launch(app)
+        except (OSError, ValueError) as e:
+            # ValueError: an entry with nothing to execute
+            logger.error(f"couldn't launch {app.get_name()}, got exception {e}")
+            return
+        self._nuke(self.ExitStatus.QUIT)
+
     def toggle_gnome_btns_focus(self, state: bool):
         self.gnome_box_wrapper.set_can_focus(state)
 
@@ -425,11 +525,13 @@ class GRunner(Adw.Application):
         self.entry.set_text("")
 
     def _show_modal(self):
-        self.modal = SettingsModal(
-            self.cfg_model,
-            self.win,
-            actions={"destroy": self._close_modal}
-        )
+        if self.modal is None:
+            self.modal = SettingsModal(
+                self.cfg_model,
+                self.app_model,
+                self.win,
+                actions={"destroy": self._close_modal}
+            )
         self.modal_is_active = True
         self.modal.present()
 
@@ -437,31 +539,55 @@ class GRunner(Adw.Application):
         self.modal_is_active = False
 
     def _nuke(self, status, *args, **kwargs):
-        if not self.modal_is_active:
-            self.exit_status = status
-            self.win.destroy()
+        if self.modal_is_active:
+            # losing focus to the settings isn't leaving, but a shutdown (e.g. over IPC) doesn't wait for them
+            if status != self.ExitStatus.SHUTDOWN:
+                return GLib.SOURCE_REMOVE
+            self.modal.close()
+            self._close_modal()
+
+        self.exit_status = status
+        self.win.set_visible(False)
+        match status:
+            case self.ExitStatus.SHUTDOWN:
+                self.release()
+                self.quit()
+            case self.ExitStatus.RELOAD:
+                # the walk runs on the engine's worker; only its outcome is handed back to the main loop
+                self.app_model.reload().add_done_callback(lambda future: GLib.idle_add(self._reloaded, future))
+        return GLib.SOURCE_REMOVE
+
+    def _reloaded(self, future: Future) -> bool:
+        if (e := future.exception()) is not None:
+            logger.error(f"reload failed, got exception {e}")
+            return GLib.SOURCE_REMOVE
+        # results still in flight were searched in the previous catalogue, & the buttons show its applications
+        self.search_scheduler.cancel()
+        self._update_application_buttons()
+        if self.win.get_visible():
+            self._entry_progressive_callback(self.entry)
+        return GLib.SOURCE_REMOVE
 
     def _inflate_application_buttons(self):
-        self.btnbox1 = XMLStaticFactory.get_application_box()[1]
-        self.gnome_btns: list[Gtk.Button] = []
+        self.btnbox1 = XMLStaticFactory.get_application_box()
+        self.gnome_btns: list[GnomeButton] = []
         for i in range(5):
-            btn = XMLStaticFactory.get_application_button()[1]
+            btn = XMLStaticFactory.get_application_button()
+            btn.bind(None)
+            btn.connect("clicked", self._gnome_btn_callback)
             self.btnbox1.append(btn)
             self.gnome_btns.append(btn)
 
         self.gnome_box_wrapper.append(self.btnbox1)
 
-    # FIXME remove
-    def __inflate_listbox_with_mock(self):
-        for i in range(1, 20):
-            self.res_lstbx.append(
-                XMLStaticFactory.create_result_list_box_row_inflatant(
-                    XMLStaticFactory.create_result_box_inflatant(
-                        f"Name{i}", f"{os.sep}path" * i, "application-x-executable-symbolic"
-                    ),
-                    lambda x: logger.debug(f"Hello world! {x}")
-                )
-            )
+    def _update_application_buttons(self) -> bool:
+        # never waits for the first walk on the main loop; it calls back once it's done
+        if self.app_model is None or not self.app_model.get_ready().done():
+            return GLib.SOURCE_REMOVE
+        apps = self.app_model.get_most_recent_applications(len(self.gnome_btns))
+        for i, btn in enumerate(self.gnome_btns):
+            btn.bind(apps[i] if i < len(apps) else None)
+        return GLib.SOURCE_REMOVE
 
     class ExitStatus(Enum):
         LOST_FOCUS = 0,
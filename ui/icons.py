@@ -0,0 +1,80 @@
+"""
+gRunner's icon texture cache.
+Icons resolved by model.icons are decoded & scaled on a worker thread, and handed to the UI as Gdk.Textures
+ through a bounded LRU, so neither theme lookups nor image decoding ever run on the GTK main loop.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from loguru import logger
+
+import gi
+
+gi.require_version("Gdk", "4.0")
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gdk, GdkPixbuf, GLib
+
+TextureKey = tuple[str, int]
+
+
+class TextureCache:
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.textures: OrderedDict[TextureKey, Gdk.Texture] = OrderedDict()
+        # keys being decoded -> callbacks waiting on them
+        self.pending: dict[TextureKey, list[Callable[[Gdk.Texture], None]]] = {}
+        # files that couldn't be decoded; not retried
+        self.failed: set[TextureKey] = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="texture-loader")
+
+    def get(self, path: str, size: int, on_ready: Callable[[Gdk.Texture], None]) -> Optional[Gdk.Texture]:
+        """
+        The texture of path scaled to size, if it's already decoded; otherwise None, and on_ready is called on the
+         main loop once it is. Main loop only.
+        """
+        key = (path, size)
+        if (texture := self.textures.get(key)) is not None:
+            self.textures.move_to_end(key)
+            return texture
+        if key in self.failed:
+            return None
+
+        if (callbacks := self.pending.get(key)) is not None:
+            callbacks.append(on_ready)
+            return None
+        self.pending[key] = [on_ready]
+        self.executor.submit(self._load, key)
+        return None
+
+    def _load(self, key: TextureKey):
+        path, size = key
+        texture = None
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, size, size, True)
+            texture = Gdk.Texture.new_for_pixbuf(pixbuf)
+        except GLib.Error as e:
+            logger.debug(f"couldn't decode icon {path}, got exception {e}")
+        except Exception:
+            logger.exception(f"couldn't load icon {path}")
+        finally:
+            # whatever happened, the key mustn't stay pending, or nothing ever asks for it again
+            GLib.idle_add(self._loaded, key, texture)
+
+    def _loaded(self, key: TextureKey, texture: Optional[Gdk.Texture]) -> bool:
+        callbacks = self.pending.pop(key, [])
+        if texture is None:
+            self.failed.add(key)
+            return GLib.SOURCE_REMOVE
+
+        self.textures[key] = texture
+        if len(self.textures) > self.capacity:
+            self.textures.popitem(last=False)
+        for on_ready in callbacks:
+            on_ready(texture)
+        return GLib.SOURCE_REMOVE
+
+
+# shared by every view of the process
+textures = TextureCache()
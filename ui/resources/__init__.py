@@ -1,4 +1,5 @@
 import enum
+import functools
 import importlib.resources as ir
 
 
@@ -10,9 +11,12 @@ class XML(enum.StrEnum):
     SETTINGS_BOX = "settings_box"
     APP_USAGE_BOX = "app_usage_box"
     ABOUT_BOX = "about_box"
+    # composite widget templates, rather than plain object definitions
     TEMPLATE_BOX = "gnome_template_box"
     GNOME_BTN = "gnome_template_btn"
 
 
-def get_resource(resource: XML) -> str:
-    return str(ir.files(__package__).joinpath(resource))
+@functools.cache
+def get_resource_bytes(resource: XML) -> bytes:
+    """Contents of resource; read from disk only the first time."""
+    return ir.files(__package__).joinpath(resource).read_bytes()
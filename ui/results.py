@@ -0,0 +1,139 @@
+"""
+gRunner's search results view model.
+Results are kept in a Gio.ListModel that a Gtk.ListView renders lazily: only the visible rows are ever
+ materialised, they're recycled while scrolling, and every update is emitted as a single minimal items-changed
+ (common prefix & suffix are kept untouched), so refining a query doesn't rebuild rows that didn't change.
+"""
+
+import functools
+from typing import Optional
+
+from model.applications.applications import Application
+from model.icons import icon_index
+from ui.icons import textures
+
+import gi
+
+gi.require_version("Gtk", "4.0")
+from gi.repository import Gdk, Gio, GLib, GObject, Gtk
+
+FALLBACK_ICON = "application-x-executable-symbolic"
+ICON_SIZE = 32
+
+
+class ResultItem(GObject.Object):
+    __gtype_name__ = "GRunnerResultItem"
+
+    def __init__(self, app: Application):
+        super().__init__()
+        self.app = app
+        self.name: str = app.get_name()
+        self.path: str = app.get_readable_path()
+        self.icon: str = app.get_icon() or FALLBACK_ICON
+
+
+class ResultStore(GObject.Object, Gio.ListModel):
+    __gtype_name__ = "GRunnerResultStore"
+
+    def __init__(self):
+        super().__init__()
+        self.items: list[ResultItem] = []
+
+    def do_get_item_type(self):
+        return ResultItem.__gtype__
+
+    def do_get_n_items(self) -> int:
+        return len(self.items)
+
+    def do_get_item(self, position: int) -> Optional[ResultItem]:
+        return self.items[position] if position < len(self.items) else None
+
+    def update(self, apps: list[Application]):
+        """Replace the contents with apps, emitting the smallest single items-changed that does so."""
+        old = self.items
+        limit = min(len(old), len(apps))
+        prefix = 0
+        while prefix < limit and old[prefix].app is apps[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix].app is apps[-1 - suffix]:
+            suffix += 1
+
+        removed = len(old) - prefix - suffix
+        added = apps[prefix:len(apps) - suffix]
+        if not removed and not added:
+            return
+        self.items[prefix:len(old) - suffix] = [ResultItem(app) for app in added]
+        self.items_changed(prefix, removed, len(added))
+
+
+class ResultRow(Gtk.Box):
+    """The (recycled) widget of a visible row."""
+
+    def __init__(self):
+        super().__init__(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.set_margin_start(10)
+        self.set_margin_end(10)
+        self.set_can_focus(False)
+        self.set_can_target(False)
+        self.set_hexpand(False)
+
+        self.item: Optional[ResultItem] = None
+        self.img: Gtk.Image = Gtk.Image.new()
+        self.img.set_can_focus(False)
+        self.img.set_can_target(False)
+        self.img.set_pixel_size(ICON_SIZE)
+
+        self.readable_lbl: Gtk.Label = Gtk.Label()
+        self.readable_lbl.set_can_focus(False)
+        self.readable_lbl.set_can_target(False)
+        self.readable_lbl.set_halign(Gtk.Align.START)
+        self.readable_lbl.set_wrap(True)
+        self.readable_lbl.set_wrap_mode(Gtk.WrapMode.CHAR)
+        self.readable_lbl.set_max_width_chars(30)
+
+        self.path_lbl: Gtk.Label = Gtk.Label()
+        self.path_lbl.set_can_focus(False)
+        self.path_lbl.set_can_target(False)
+        self.path_lbl.set_sensitive(False)
+        self.path_lbl.set_halign(Gtk.Align.START)
+        self.path_lbl.set_wrap(True)
+        self.path_lbl.set_wrap_mode(Gtk.WrapMode.CHAR)
+        self.path_lbl.set_max_width_chars(30)
+
+        lbl_bx: Gtk.Box = Gtk.Box.new(Gtk.Orientation.VERTICAL, 0)
+        lbl_bx.set_can_focus(False)
+        lbl_bx.set_can_target(False)
+        lbl_bx.set_hexpand(True)
+        lbl_bx.append(self.readable_lbl)
+        lbl_bx.append(self.path_lbl)
+
+        self.append(self.img)
+        self.append(lbl_bx)
+
+    def bind(self, item: ResultItem):
+        self.item = item
+        self.readable_lbl.set_markup(f"<b>{GLib.markup_escape_text(item.name)}</b>")
+        self.path_lbl.set_markup(f"<i>{GLib.markup_escape_text(item.path)}</i>")
+
+        # only icons the engine already resolved are shown; anything else keeps the fallback
+        texture = None
+        if path := icon_index.lookup(item.icon):
+            size = ICON_SIZE * self.get_scale_factor()
+            texture = textures.get(path, size, functools.partial(self._on_texture, item))
+        if texture is not None:
+            self.img.set_from_paintable(texture)
+        else:
+            self.img.set_from_icon_name(FALLBACK_ICON)
+
+    def _on_texture(self, item: ResultItem, texture: Gdk.Texture):
+        # the row may have been recycled for another item in the meantime
+        if self.item is item:
+            self.img.set_from_paintable(texture)
+
+
+def create_result_factory() -> Gtk.SignalListItemFactory:
+    factory = Gtk.SignalListItemFactory()
+    factory.connect("setup", lambda _, list_item: list_item.set_child(ResultRow()))
+    factory.connect("bind", lambda _, list_item: list_item.get_child().bind(list_item.get_item()))
+    return factory
@@ -0,0 +1,89 @@
+"""
+gRunner's search scheduler.
+Keeps searching off the GTK main loop: keystrokes are debounced & coalesced on the main loop, the newest query is
+ run on a worker thread, and its results are posted back with GLib.idle_add. Every submission bumps a generation
+ number; queries & results of older generations are dropped, so only the latest keystroke is ever rendered.
+Every rendered query is recorded as a "ui.keystroke" span, from the keystroke to its results, debounce included;
+ only the amount of results is attached to it, never what was typed.
+"""
+
+import threading
+from time import perf_counter_ns
+from typing import Callable, Optional
+
+from loguru import logger
+
+from model.applications.applications import Application
+from model.search import SearchSession
+from tracing import tracer
+
+from gi.repository import GLib
+
+
+class SearchScheduler:
+    def __init__(self, session: SearchSession, count: int,
+                 on_results: Callable[[str, list[Application]], None],
+                 debounce_ms: int = 30):
+        self.session = session
+        self.count = count
+        self.on_results = on_results
+        self.debounce_ms = debounce_ms
+
+        # only ever bumped on the main loop; the worker just compares against it
+        self.generation = 0
+        self.timeout_id: Optional[int] = None
+
+        self.condition = threading.Condition()
+        # generation, query & when it was typed
+        self.request: Optional[tuple[int, str, int]] = None
+        self.thread = threading.Thread(target=self._loop, name="search-scheduler", daemon=True)
+        self.thread.start()
+
+    def submit(self, query: str):
+        """Schedule query, superseding anything scheduled before. Main loop only."""
+        self.cancel()
+        if not query:
+            # nothing to search for; clear right away rather than after the debounce
+            self.on_results(query, [])
+            return
+        self.timeout_id = GLib.timeout_add(self.debounce_ms, self._dispatch, self.generation, query, perf_counter_ns())
+
+    def cancel(self):
+        """Drop the scheduled & in-flight queries. Main loop only."""
+        self.generation += 1
+        if self.timeout_id is not None:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+
+    def _dispatch(self, generation: int, query: str, typed_ns: int) -> bool:
+        self.timeout_id = None
+        with self.condition:
+            # a query still waiting for the worker is simply replaced
+            self.request = (generation, query, typed_ns)
+            self.condition.notify()
+        return GLib.SOURCE_REMOVE
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                while self.request is None:
+                    self.condition.wait()
+                generation, query, typed_ns = self.request
+                self.request = None
+
+            if generation != self.generation:
+                continue
+            try:
+                results = self.session.search(query, self.count)
+            except Exception as e:
+                logger.error(f"search for {query} failed, got exception {e}")
+                continue
+            if generation == self.generation:
+                GLib.idle_add(self._deliver, generation, query, results, typed_ns)
+
+    def _deliver(self, generation: int, query: str, results: list[Application], typed_ns: int) -> bool:
+        # the last check happens on the main loop, where the generation can't change underneath us
+        if generation == self.generation:
+            self.on_results(query, results)
+            tracer.record("ui.keystroke", typed_ns, args={"results": len(results)})
+        return GLib.SOURCE_REMOVE